@@ -16,10 +16,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from shared.constants import (
     SERVER_IP, AUDIO_PORT, AUDIO_BUFFER_SIZE,
-    AUDIO_RATE, AUDIO_CHANNELS, AUDIO_CHUNK, AUDIO_FORMAT
+    AUDIO_RATE, AUDIO_CHANNELS, AUDIO_CHUNK, AUDIO_FORMAT,
+    UDP_RECV_BATCH
 )
 from shared.protocol import AUDIO
 from shared.helpers import pack_message
+from shared.mmsg import DatagramReceiver, HAVE_RECVMMSG
 
 
 class AudioStreamer:
@@ -145,6 +147,11 @@ class AudioReceiver:
         self.rate = AUDIO_RATE
         self.chunk = AUDIO_CHUNK
         
+        # Batch receives with recvmmsg where available
+        self.receiver = None
+        if HAVE_RECVMMSG:
+            self.receiver = DatagramReceiver(UDP_RECV_BATCH, AUDIO_BUFFER_SIZE)
+    
     def start_receiving(self):
         """Receive and play audio streams"""
         self.audio = pyaudio.PyAudio()
@@ -178,31 +185,35 @@ class AudioReceiver:
             
             while self.running:
                 try:
-                    # Receive packet
-                    data, addr = self.sock.recvfrom(AUDIO_BUFFER_SIZE)
+                    # Receive every queued packet at once
+                    if self.receiver:
+                        packets = self.receiver.recv(self.sock)
+                    else:
+                        packets = (self.sock.recvfrom(AUDIO_BUFFER_SIZE),)
                     
-                    # Track sender
-                    if last_sender != addr[0]:
-                        last_sender = addr[0]
-                        print(f"\n🎧 Receiving audio from {addr[0]}:{addr[1]}")
+                    for data, addr in packets:
+                        # Track sender
+                        if last_sender != addr[0]:
+                            last_sender = addr[0]
+                            print(f"\n🎧 Receiving audio from {addr[0]}:{addr[1]}")
                     
-                    # Unpack message
-                    audio_data = self._extract_audio_data(data)
+                        # Unpack message
+                        audio_data = self._extract_audio_data(data)
                     
-                    if audio_data:
-                        # Play audio
-                        self.stream.write(audio_data)
+                        if audio_data:
+                            # Play audio
+                            self.stream.write(audio_data)
                         
-                        # Statistics
-                        packet_count += 1
+                            # Statistics
+                            packet_count += 1
                         
-                        # Print stats every 100 packets
-                        if packet_count % 100 == 0:
-                            elapsed = time.time() - start_time
-                            packets_per_sec = packet_count / elapsed
-                            print(f"🎵 Received {packet_count} packets | "
-                                  f"{packets_per_sec:.1f} pkt/s | "
-                                  f"Audio data: {len(audio_data)} bytes")
+                            # Print stats every 100 packets
+                            if packet_count % 100 == 0:
+                                elapsed = time.time() - start_time
+                                packets_per_sec = packet_count / elapsed
+                                print(f"🎵 Received {packet_count} packets | "
+                                      f"{packets_per_sec:.1f} pkt/s | "
+                                      f"Audio data: {len(audio_data)} bytes")
                         
                 except socket.timeout:
                     continue
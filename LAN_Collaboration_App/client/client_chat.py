@@ -14,13 +14,17 @@ from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from shared.constants import (
-    SERVER_IP, CHAT_PORT, BUFFER_SIZE,
-    CONNECTION_TIMEOUT, MAX_RETRIES, RETRY_DELAY
+    SERVER_IP, CHAT_PORT, BUFFER_SIZE, HEADER_SIZE,
+    CONNECTION_TIMEOUT, MAX_RETRIES, RETRY_DELAY, CHAT_SOCKET_BUFFER_SIZE,
+    MAX_MESSAGE_SIZE, PROTOCOL_VERSION
 )
 from shared.protocol import CHAT, DISCONNECT, USER_LIST
-from shared.helpers import pack_message, unpack_message
+from shared.helpers import pack_message, unpack_message, unpack_header, pack_header_into
 import json
 
+# Chat messages up to this size are framed in a reused send buffer
+SEND_BUFFER_SIZE = 4096
+
 
 class ChatClient:
     """Handles TCP-based chat communication"""
@@ -36,6 +40,11 @@ class ChatClient:
         self.user_list_callback = None  # Callback for user list updates
         self.message_callback = None  # Callback for incoming messages
         
+        # Reused packet buffer; the GUI and the input loop may both send
+        self._send_buffer = bytearray(HEADER_SIZE + SEND_BUFFER_SIZE)
+        self._send_view = memoryview(self._send_buffer)
+        self._send_lock = threading.Lock()
+        
     def connect(self, username):
         """Connect to the chat server"""
         self.username = username
@@ -45,6 +54,12 @@ class ChatClient:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.sock.settimeout(CONNECTION_TIMEOUT)
             
+            # Small messages go out immediately; buffers set before connect
+            # so the window is negotiated with them
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CHAT_SOCKET_BUFFER_SIZE)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CHAT_SOCKET_BUFFER_SIZE)
+            
             print(f"\n🔌 Connecting to chat server at {self.server_ip}:{self.server_port}...")
             
             # Connect to server
@@ -111,12 +126,19 @@ class ChatClient:
         try:
             # Encode message as UTF-8
             message_bytes = message.encode('utf-8')
+            length = len(message_bytes)
             
-            # Pack with protocol header
-            packet = pack_message(CHAT, message_bytes)
+            if length > SEND_BUFFER_SIZE:
+                self.sock.sendall(pack_message(CHAT, message_bytes))
+                return True
             
-            # Send via TCP
-            self.sock.sendall(packet)
+            # Frame the message behind the header in the reused buffer
+            with self._send_lock:
+                pack_header_into(self._send_buffer, CHAT, length)
+                self._send_view[HEADER_SIZE:HEADER_SIZE + length] = message_bytes
+                
+                # Send via TCP
+                self.sock.sendall(self._send_view[:HEADER_SIZE + length])
             return True
             
         except BrokenPipeError:
@@ -131,53 +153,61 @@ class ChatClient:
         """Continuously listen for incoming messages (runs in thread)"""
         print("👂 Listening for messages...\n")
         
-        buffer = b""
+        buffer = bytearray()
+        offset = 0
+        
+        # Receive into one reused buffer instead of a new bytes per recv
+        recv_view = memoryview(bytearray(BUFFER_SIZE))
         
         while self.running:
             try:
-                # Receive data
-                data = self.sock.recv(BUFFER_SIZE)
+                # Receive data; one recv usually carries several messages
+                count = self.sock.recv_into(recv_view)
                 
-                if not data:
+                if not count:
                     # Server closed connection
                     print("\n⚠️  Server closed the connection")
                     self.running = False
                     break
                 
-                buffer += data
+                buffer += recv_view[:count]
                 
-                # Try to extract complete messages from buffer
-                while len(buffer) >= 12:  # Minimum header size
+                # Extract every complete message before receiving again
+                while len(buffer) - offset >= HEADER_SIZE:
+                    version, msg_type, payload_length, seq_num = unpack_header(buffer, offset)
+                    
+                    # Bound the receive buffer: refuse lengths no sender may use
+                    if version != PROTOCOL_VERSION or payload_length > MAX_MESSAGE_SIZE:
+                        print("\n❌ Invalid message header from server, disconnecting")
+                        self.running = False
+                        break
+                    
+                    message_size = HEADER_SIZE + payload_length
+                    if len(buffer) - offset < message_size:
+                        break  # Wait for the rest of the message
+                    
+                    payload = memoryview(buffer)[offset + HEADER_SIZE:offset + message_size]
+                    offset += message_size
+                    
                     try:
-                        # Try to unpack message
-                        version, msg_type, payload_length, seq_num, payload = unpack_message(buffer)
-                        
-                        # Calculate total message size
-                        message_size = 12 + payload_length
-                        
-                        # Check if we have the complete message
-                        if len(buffer) < message_size:
-                            break  # Wait for more data
-                        
                         # Decode and display message
                         if msg_type == CHAT:
-                            message_text = payload.decode('utf-8')
+                            message_text = str(payload, 'utf-8')
                             self._display_message(message_text)
                         elif msg_type == USER_LIST:
-                            user_list_json = payload.decode('utf-8')
-                            self.user_list = json.loads(user_list_json)
+                            self.user_list = json.loads(str(payload, 'utf-8'))
                             if self.user_list_callback:
                                 self.user_list_callback(self.user_list)
-                        
-                        # Remove processed message from buffer
-                        buffer = buffer[message_size:]
-                        
-                    except ValueError:
-                        # Incomplete message, wait for more data
-                        break
                     except Exception as e:
                         print(f"\n⚠️  Error processing message: {e}")
-                        buffer = buffer[1:]  # Skip one byte and try again
+                    finally:
+                        # The payload view pins the buffer; release it before resizing
+                        payload.release()
+                
+                # Drop processed messages from the buffer
+                if offset:
+                    del buffer[:offset]
+                    offset = 0
                         
             except socket.timeout:
                 continue
@@ -17,14 +17,18 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from shared.constants import (
     SERVER_IP, FILE_TRANSFER_PORT, FILE_CHUNK_SIZE,
-    MAX_FILE_SIZE, CONNECTION_TIMEOUT
+    MAX_FILE_SIZE, MAX_MESSAGE_SIZE, CONNECTION_TIMEOUT, HEADER_SIZE,
+    FILE_SOCKET_BUFFER_SIZE
 )
 from shared.protocol import FILE_UPLOAD, FILE_DOWNLOAD, FILE_METADATA, FILE_CHUNK
 from shared.helpers import (
-    pack_message, unpack_message,
+    pack_message, unpack_message, pack_header,
     pack_file_metadata, unpack_file_metadata
 )
 
+# Linux: queue a send until more data follows (0 elsewhere)
+MSG_MORE = getattr(socket, 'MSG_MORE', 0)
+
 
 class FileTransferClient:
     """Handles file upload and download operations"""
@@ -39,6 +43,13 @@ class FileTransferClient:
         try:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.sock.settimeout(CONNECTION_TIMEOUT)
+            
+            # Match the server's bulk settings; buffers set before connect
+            # so the window is negotiated with them
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, FILE_SOCKET_BUFFER_SIZE)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, FILE_SOCKET_BUFFER_SIZE)
+            
             self.sock.connect((self.server_ip, self.server_port))
             print(f"✓ Connected to file transfer server at {self.server_ip}:{self.server_port}")
             return True
@@ -113,19 +124,19 @@ class FileTransferClient:
                 with tqdm(total=file_size, unit='B', unit_scale=True, 
                          desc="Uploading", ncols=80) as pbar:
                     while bytes_sent < file_size:
-                        # Read chunk
-                        chunk_size = min(FILE_CHUNK_SIZE, file_size - bytes_sent)
-                        chunk = f.read(chunk_size)
+                        # The server accepts chunks up to a full message
+                        chunk_size = min(MAX_MESSAGE_SIZE, file_size - bytes_sent)
                         
-                        if not chunk:
-                            break
+                        # Hold the header back until the chunk follows it;
+                        # sendfile(2) then moves the chunk from the page cache
+                        self.sock.sendall(pack_header(FILE_CHUNK, chunk_size), MSG_MORE)
+                        chunk_length = self.sock.sendfile(f, offset=bytes_sent, count=chunk_size)
                         
-                        # Pack and send chunk
-                        chunk_packet = pack_message(FILE_CHUNK, chunk)
-                        self.sock.sendall(chunk_packet)
+                        if chunk_length != chunk_size:
+                            raise IOError("File changed while uploading")
                         
-                        bytes_sent += len(chunk)
-                        pbar.update(len(chunk))
+                        bytes_sent += chunk_length
+                        pbar.update(chunk_length)
             
             # Wait for acknowledgment
             print("\n⏳ Waiting for server acknowledgment...")
@@ -203,24 +214,35 @@ class FileTransferClient:
                 with tqdm(total=file_size, unit='B', unit_scale=True,
                          desc="Downloading", ncols=80) as pbar:
                     while bytes_received < file_size:
-                        # Receive chunk
-                        chunk_data = self._receive_message()
+                        # Receive chunk header; the server sends the whole
+                        # file as one frame, older servers as many frames
+                        header = self._recv_exact(HEADER_SIZE)
                         
-                        if not chunk_data:
+                        if not header:
                             print("\n❌ Connection lost")
                             return False
                         
-                        # Unpack chunk
-                        version, msg_type, payload_length, seq_num, chunk = unpack_message(chunk_data)
+                        msg_type = header[1]
+                        payload_length = struct.unpack('!I', header[2:6])[0]
                         
                         if msg_type != FILE_CHUNK:
                             print(f"\n❌ Unexpected message type: {msg_type}")
                             return False
                         
-                        # Write chunk
-                        f.write(chunk)
-                        bytes_received += len(chunk)
-                        pbar.update(len(chunk))
+                        # Stream the payload straight to disk
+                        remaining = payload_length
+                        while remaining > 0:
+                            chunk = self.sock.recv(min(remaining, FILE_CHUNK_SIZE))
+                            
+                            if not chunk:
+                                print("\n❌ Connection lost")
+                                return False
+                            
+                            # Write chunk
+                            f.write(chunk)
+                            remaining -= len(chunk)
+                            bytes_received += len(chunk)
+                            pbar.update(len(chunk))
             
             print(f"\n✓ Download complete!")
             print(f"📊 Total received: {self._format_size(bytes_received)}")
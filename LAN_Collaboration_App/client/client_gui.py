@@ -6,6 +6,7 @@ Google Meet/Zoom style with dark theme, grid layout, and integrated chat
 import sys
 import os
 import threading
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 import warnings
@@ -36,6 +37,14 @@ from client_chat import ChatClient
 from client_screen_share import ScreenStreamer, ScreenReceiver
 from client_file_transfer import FileTransferClient
 
+# Chat widgets kept in the panel; older ones are dropped so inserts stay cheap
+MAX_CHAT_MESSAGES = 500
+
+# Received chat messages waiting for the GUI thread, and how many one timer
+# tick displays
+CHAT_QUEUE_SIZE = 8192
+CHAT_DRAIN_BATCH = 256
+
 
 class ChatMessage(QWidget):
     """Individual chat message bubble widget"""
@@ -153,7 +162,6 @@ class GUISignals(QObject):
     status_message = pyqtSignal(str)
     video_frame_ready = pyqtSignal(str, object)  # username, frame
     user_list_updated = pyqtSignal(list)  # list of usernames
-    chat_message_received = pyqtSignal(str, str)  # message, timestamp
 
 
 class ModernCollaborationGUI(QMainWindow):
@@ -172,6 +180,7 @@ class ModernCollaborationGUI(QMainWindow):
         self.audio_streamer = None
         self.audio_receiver = None
         self.chat_client = None
+        self._chat_connecting = False
         self.screen_streamer = None
         self.file_client = None
         
@@ -188,11 +197,15 @@ class ModernCollaborationGUI(QMainWindow):
         
         self.user_tiles = {}  # {username: VideoTile}
         self.connected_users = []  # List of connected usernames
+        self._chat_scroll_pending = False
+        
+        # Filled by the chat receive thread, drained by chat_timer; deque
+        # append and popleft are atomic, so neither side takes a lock
+        self._chat_queue = deque(maxlen=CHAT_QUEUE_SIZE)
         
         self.gui_signals = GUISignals()
         self.gui_signals.status_message.connect(self.add_system_message)
         self.gui_signals.user_list_updated.connect(self.update_user_tiles)
-        self.gui_signals.chat_message_received.connect(self.display_received_message)
         
         self.setup_connection()
         self.init_ui()
@@ -201,6 +214,10 @@ class ModernCollaborationGUI(QMainWindow):
         self.video_timer.timeout.connect(self.update_video_frame)
         self.video_timer.start(33)
         
+        self.chat_timer = QTimer()
+        self.chat_timer.timeout.connect(self._drain_chat_queue)
+        self.chat_timer.start(16)
+        
         self.meeting_start_time = datetime.now()
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.update_ui)
@@ -612,34 +629,84 @@ class ModernCollaborationGUI(QMainWindow):
         label.setAlignment(Qt.AlignCenter)
         msg_layout.addWidget(label)
         
+        self._append_chat_widget(msg_widget)
+    
+    def _append_chat_widget(self, msg_widget):
+        """Add a message widget to the chat panel and keep it scrolled down"""
         self.messages_layout.addWidget(msg_widget)
         
+        # Trim the history so the layout does not grow without bound
+        while self.messages_layout.count() > MAX_CHAT_MESSAGES:
+            item = self.messages_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+        
+        # A burst of messages scrolls once, after the layout has settled
+        if not self._chat_scroll_pending:
+            self._chat_scroll_pending = True
+            QTimer.singleShot(0, self._scroll_chat_to_bottom)
+    
+    def _scroll_chat_to_bottom(self):
+        """Scroll the chat panel to the newest message"""
+        self._chat_scroll_pending = False
         scrollbar = self.chat_messages.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
     
     def connect_to_chat(self):
-        """Establish chat server connection"""
+        """Start connecting to the chat server in the background
+        
+        connect() can block for the whole connection timeout when the
+        server is unreachable, which would freeze the window.
+        """
+        if self._chat_connecting:
+            return
+        
+        self._chat_connecting = True
+        threading.Thread(target=self._connect_chat_client, daemon=True).start()
+    
+    def _connect_chat_client(self):
+        """Establish chat server connection (runs in a background thread)"""
         try:
-            self.chat_client = ChatClient(self.server_ip, CHAT_PORT)
-            if self.chat_client.connect(self.username):
-                self.chat_client.set_user_list_callback(self.on_user_list_update)
-                self.chat_client.set_message_callback(self.on_chat_message_received)
-                self.add_system_message(f"Connected as {self.username}")
-                return True
+            chat_client = ChatClient(self.server_ip, CHAT_PORT)
+            
+            # Set callbacks first so the join-time user list is not missed
+            chat_client.set_user_list_callback(self.on_user_list_update)
+            chat_client.set_message_callback(self.on_chat_message_received)
+            
+            if chat_client.connect(self.username):
+                self.gui_signals.status_message.emit(f"Connected as {self.username}")
             else:
-                self.add_system_message("Chat connection failed")
-                return False
+                self.gui_signals.status_message.emit("Chat connection failed")
+            self.chat_client = chat_client
         except Exception as e:
-            self.add_system_message(f"Chat error: {str(e)}")
-            return False
+            self.gui_signals.status_message.emit(f"Chat error: {str(e)}")
+        finally:
+            self._chat_connecting = False
     
     def on_user_list_update(self, user_list):
         """Called when user list is updated from server"""
         self.gui_signals.user_list_updated.emit(user_list)
     
     def on_chat_message_received(self, message, timestamp):
-        """Called when chat message is received"""
-        self.gui_signals.chat_message_received.emit(message, timestamp)
+        """Called on the chat receive thread; queue the message for the GUI"""
+        self._chat_queue.append((message, timestamp))
+    
+    def _drain_chat_queue(self):
+        """Display queued chat messages as one batch"""
+        if not self._chat_queue:
+            return
+        
+        # One repaint for the whole batch instead of one per message
+        self.chat_messages.setUpdatesEnabled(False)
+        try:
+            for _ in range(CHAT_DRAIN_BATCH):
+                try:
+                    message, timestamp = self._chat_queue.popleft()
+                except IndexError:
+                    break
+                self.display_received_message(message, timestamp)
+        finally:
+            self.chat_messages.setUpdatesEnabled(True)
     
     def display_received_message(self, message, timestamp):
         """Display received chat message in GUI"""
@@ -671,11 +738,7 @@ class ModernCollaborationGUI(QMainWindow):
             label.setAlignment(Qt.AlignCenter)
             msg_layout.addWidget(label)
         
-        self.messages_layout.addWidget(msg_widget)
-        
-        # Auto-scroll to bottom
-        scrollbar = self.chat_messages.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        self._append_chat_widget(msg_widget)
     
     def update_user_tiles(self, user_list):
         """Update video tiles based on connected users"""
@@ -708,6 +771,8 @@ class ModernCollaborationGUI(QMainWindow):
         
         if not self.chat_client:
             self.connect_to_chat()
+            self.add_system_message("Connecting to chat, please send again shortly")
+            return
         
         # Send to server - message will appear when server echoes it back
         if self.chat_client:
@@ -731,7 +796,7 @@ class ModernCollaborationGUI(QMainWindow):
         filename = Path(file_path).name
         timestamp = datetime.now().strftime("%I:%M %p")
         msg = ChatMessage(self.username, filename, timestamp, is_file=True)
-        self.messages_layout.addWidget(msg)
+        self._append_chat_widget(msg)
         
         def upload_thread():
             try:
@@ -743,9 +808,6 @@ class ModernCollaborationGUI(QMainWindow):
                 self.gui_signals.status_message.emit(f"Upload failed: {str(e)}")
         
         threading.Thread(target=upload_thread, daemon=True).start()
-        
-        scrollbar = self.chat_messages.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
     
     def toggle_video(self):
         """Toggle video streaming"""
@@ -1090,6 +1152,7 @@ class ModernCollaborationGUI(QMainWindow):
         try:
             self.update_timer.stop()
             self.video_timer.stop()
+            self.chat_timer.stop()
         except:
             pass
         
@@ -20,7 +20,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from shared.constants import (
     SERVER_IP, SCREEN_SHARE_PORT, VIDEO_QUALITY,
-    BUFFER_SIZE, CONNECTION_TIMEOUT
+    BUFFER_SIZE, CONNECTION_TIMEOUT, SCREEN_SOCKET_BUFFER_SIZE
 )
 from shared.protocol import SCREEN_SHARE
 from shared.helpers import pack_message
@@ -42,6 +42,12 @@ class ScreenStreamer:
         """Connect to the screen share server"""
         try:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            
+            # Frames go out as soon as they are written; buffers set before
+            # connect so the window is negotiated with them
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SCREEN_SOCKET_BUFFER_SIZE)
+            
             self.sock.connect((self.server_ip, self.server_port))
             print(f"✓ Connected to screen share server at {self.server_ip}:{self.server_port}")
             return True
@@ -16,10 +16,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from shared.constants import (
     SERVER_IP, VIDEO_PORT, VIDEO_BUFFER_SIZE,
-    VIDEO_WIDTH, VIDEO_HEIGHT, VIDEO_FPS, VIDEO_QUALITY
+    VIDEO_WIDTH, VIDEO_HEIGHT, VIDEO_FPS, VIDEO_QUALITY,
+    UDP_RECV_BATCH
 )
 from shared.protocol import VIDEO
 from shared.helpers import pack_message
+from shared.mmsg import DatagramReceiver, HAVE_RECVMMSG
 
 
 class VideoStreamer:
@@ -33,6 +35,9 @@ class VideoStreamer:
         self.running = False
         self.cap = None
         
+        # JPEG settings, built once instead of per frame
+        self.encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), VIDEO_QUALITY]
+        
     def start_streaming(self):
         """Capture webcam frames and stream them to server"""
         self.cap = cv2.VideoCapture(0)
@@ -50,6 +55,11 @@ class VideoStreamer:
         frame_count = 0
         start_time = time.time()
         
+        # Frames are paced against a fixed schedule, so capture and encode
+        # time come out of the frame interval instead of adding to it
+        frame_interval = 1.0 / VIDEO_FPS
+        next_frame_time = start_time + frame_interval
+        
         print(f"Starting video stream to {self.server_ip}:{self.server_port}")
         print("Press 'q' to quit")
         
@@ -83,8 +93,12 @@ class VideoStreamer:
                     fps = frame_count / elapsed
                     print(f"Streaming at {fps:.2f} FPS | Packet size: {len(packet)} bytes")
                 
-                # Control frame rate
-                if cv2.waitKey(int(1000/VIDEO_FPS)) & 0xFF == ord('q'):
+                # Control frame rate; waitKey needs at least 1 ms to poll the window
+                now = time.time()
+                delay_ms = max(1, int((next_frame_time - now) * 1000))
+                next_frame_time = max(next_frame_time + frame_interval, now)
+                
+                if cv2.waitKey(delay_ms) & 0xFF == ord('q'):
                     break
                     
         finally:
@@ -92,8 +106,7 @@ class VideoStreamer:
     
     def compress_frame(self, frame):
         """Compress frame to JPEG bytes"""
-        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), VIDEO_QUALITY]
-        result, encoded_frame = cv2.imencode('.jpg', frame, encode_param)
+        result, encoded_frame = cv2.imencode('.jpg', frame, self.encode_param)
         
         if not result:
             raise Exception("Failed to encode frame")
@@ -119,6 +132,11 @@ class VideoReceiver:
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, VIDEO_BUFFER_SIZE)
         self.running = False
         
+        # Batch receives with recvmmsg where available
+        self.receiver = None
+        if HAVE_RECVMMSG:
+            self.receiver = DatagramReceiver(UDP_RECV_BATCH, VIDEO_BUFFER_SIZE)
+    
     def start_receiving(self):
         """Receive and display video frames"""
         try:
@@ -132,21 +150,30 @@ class VideoReceiver:
             
             while self.running:
                 try:
-                    # Receive packet
-                    data, addr = self.sock.recvfrom(VIDEO_BUFFER_SIZE)
+                    # Receive every queued packet at once
+                    if self.receiver:
+                        packets = self.receiver.recv(self.sock)
+                    else:
+                        packets = (self.sock.recvfrom(VIDEO_BUFFER_SIZE),)
+                    
+                    # When behind, only each sender's newest frame is worth decoding
+                    latest = {}
+                    for data, addr in packets:
+                        latest[addr] = data
                     
-                    # Decompress and display frame
-                    frame = self.decompress_frame(data)
+                    for addr, data in latest.items():
+                        # Decompress and display frame
+                        frame = self.decompress_frame(data)
                     
-                    if frame is not None:
-                        cv2.imshow(f'Video Stream - Receiving from {addr[0]}', frame)
+                        if frame is not None:
+                            cv2.imshow(f'Video Stream - Receiving from {addr[0]}', frame)
                         
-                        # Calculate and display FPS
-                        frame_count += 1
-                        if frame_count % 30 == 0:
-                            elapsed = time.time() - start_time
-                            fps = frame_count / elapsed
-                            print(f"Receiving at {fps:.2f} FPS from {addr[0]}:{addr[1]}")
+                            # Calculate and display FPS
+                            frame_count += 1
+                            if frame_count % 30 == 0:
+                                elapsed = time.time() - start_time
+                                fps = frame_count / elapsed
+                                print(f"Receiving at {fps:.2f} FPS from {addr[0]}:{addr[1]}")
                     
                     # Check for quit
                     if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -3,6 +3,7 @@ Network utilities for LAN Collaboration App
 Reusable socket creation, sending, and receiving functions
 """
 
+import functools
 import socket
 import struct
 import sys
@@ -180,23 +181,38 @@ def connect_with_retry(sock, address, max_retries=3, retry_delay=1):
     return False
 
 
+@functools.lru_cache(maxsize=1)
+def _lookup_local_ip():
+    """Find the local IP of the default route (cached; failures are not)"""
+    # Create a dummy socket to find local IP
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
+
 def get_local_ip():
     """Get local IP address
     
+    The address is looked up once and reused; call invalidate_local_ip_cache()
+    after a network change.
+    
     Returns:
         str: Local IP address
     """
     try:
-        # Create a dummy socket to find local IP
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-        s.close()
-        return local_ip
+        return _lookup_local_ip()
     except Exception:
         return "127.0.0.1"
 
 
+def invalidate_local_ip_cache():
+    """Forget the cached local IP so the next get_local_ip() looks it up again"""
+    _lookup_local_ip.cache_clear()
+
+
 def is_port_open(host, port, timeout=1):
     """Check if a port is open on a host
     
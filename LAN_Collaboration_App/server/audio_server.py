@@ -5,6 +5,7 @@ Uses UDP for real-time audio transmission
 """
 
 import socket
+import selectors
 import threading
 import sys
 import os
@@ -14,17 +15,30 @@ from collections import deque
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from shared.constants import AUDIO_PORT, AUDIO_BUFFER_SIZE, AUDIO_CHUNK
+from shared.constants import (
+    AUDIO_PORT, AUDIO_BUFFER_SIZE, AUDIO_CHUNK, UDP_RECV_BATCH,
+    CLEANUP_INTERVAL, MAX_CONNECTIONS
+)
 from shared.protocol import AUDIO
 from shared.helpers import unpack_message, pack_message
+from shared.mmsg import DatagramReceiver, DatagramBatchSender, HAVE_RECVMMSG, HAVE_SENDMMSG
+from shared.reactor import Reactor
 
 
 class AudioConferenceServer:
-    """Multi-user audio conferencing server with mixing"""
+    """Multi-user audio conferencing server with mixing
+    
+    Receiving runs as a Reactor service (see VideoConferenceServer); the
+    mixer keeps its own thread for steady 20 ms timing.
+    """
     
     def __init__(self, port=AUDIO_PORT):
         self.port = port
         self.sock = None
+        self.selector = None
+        self.receiver = None
+        self.sender = None
+        self._send_failing = False
         self.running = False
         
         # Audio buffers for each client: {addr: deque of audio chunks}
@@ -44,66 +58,113 @@ class AudioConferenceServer:
         
         # Mixing parameters
         self.mix_interval = 0.02  # 20ms mixing interval
+        
+        # Scratch buffers reused by the mixer (sized for one full datagram of samples)
+        self.mix_total = np.zeros(AUDIO_BUFFER_SIZE // 2, dtype=np.int32)
+        self.mix_acc = np.zeros(AUDIO_BUFFER_SIZE // 2, dtype=np.int32)
+        self.mix_out = np.empty(AUDIO_BUFFER_SIZE // 2, dtype=np.int16)
+        
+        # Stale clients are swept from the reactor thread
+        self._next_cleanup = 0
     
     def start(self):
         """Start the audio conference server"""
         try:
-            # Create UDP socket
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, AUDIO_BUFFER_SIZE)
-            self.sock.bind(('0.0.0.0', self.port))
-            self.sock.settimeout(0.1)
-            
-            self.running = True
-            
-            print(f"🎵 Audio Conference Server listening on UDP port {self.port}")
-            
-            # Start mixer thread
-            mixer_thread = threading.Thread(target=self._audio_mixer, daemon=True)
-            mixer_thread.start()
-            
-            # Start cleanup thread
-            cleanup_thread = threading.Thread(target=self._cleanup_stale_clients, daemon=True)
-            cleanup_thread.start()
-            
-            # Main receiver loop
-            while self.running:
-                try:
-                    # Receive audio packet
-                    data, sender_addr = self.sock.recvfrom(AUDIO_BUFFER_SIZE)
-                    
-                    # Update client tracking
-                    with self.clients_lock:
-                        self.clients[sender_addr] = time.time()
-                    
-                    # Extract audio data
-                    try:
-                        version, msg_type, payload_length, seq_num, audio_data = unpack_message(data)
-                        
-                        # Add to client's buffer
-                        with self.buffers_lock:
-                            if sender_addr not in self.audio_buffers:
-                                self.audio_buffers[sender_addr] = deque(maxlen=10)
-                            self.audio_buffers[sender_addr].append(audio_data)
-                        
-                        # Update stats
-                        self.stats['total_packets'] += 1
-                        self.stats['total_bytes'] += len(data)
-                        
-                    except Exception as e:
-                        continue
-                        
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if self.running:
-                        print(f"⚠️  Audio receive error: {e}")
-                        
+            reactor = Reactor()
+            reactor.add(self)
+            reactor.run()
         except Exception as e:
             print(f"❌ Audio server error: {e}")
         finally:
             self.stop()
     
+    def register(self, selector):
+        """Open the UDP socket and register it with a reactor selector"""
+        # Create UDP socket
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, AUDIO_BUFFER_SIZE)
+        self.sock.bind(('0.0.0.0', self.port))
+        
+        # The reactor thread is shared with other services: never block on this socket
+        self.sock.setblocking(False)
+        
+        # Batch receives with recvmmsg where available
+        if HAVE_RECVMMSG:
+            self.receiver = DatagramReceiver(UDP_RECV_BATCH, AUDIO_BUFFER_SIZE)
+        
+        # Each client gets its own mix; send them all with one sendmmsg
+        if HAVE_SENDMMSG:
+            self.sender = DatagramBatchSender(MAX_CONNECTIONS)
+        
+        self.selector = selector
+        selector.register(self.sock, selectors.EVENT_READ, data=self)
+        
+        self.running = True
+        
+        print(f"🎵 Audio Conference Server listening on UDP port {self.port}")
+        
+        # Start mixer thread
+        mixer_thread = threading.Thread(target=self._audio_mixer, daemon=True)
+        mixer_thread.start()
+        
+        self._next_cleanup = time.time() + CLEANUP_INTERVAL
+    
+    def handle(self, key, mask):
+        """Queue the audio packets waiting on the socket"""
+        try:
+            # Receive audio packets
+            if self.receiver:
+                packets = self.receiver.recv(self.sock)
+            else:
+                packets = (self.sock.recvfrom(AUDIO_BUFFER_SIZE),)
+            
+            for data, sender_addr in packets:
+                self._handle_audio_packet(data, sender_addr)
+                
+        except (socket.timeout, BlockingIOError):
+            pass
+        except Exception as e:
+            if self.running:
+                print(f"⚠️  Audio receive error: {e}")
+    
+    def after_select(self):
+        """Sweep stale clients once per cleanup interval"""
+        now = time.time()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + CLEANUP_INTERVAL
+            self._cleanup_stale_clients(now)
+    
+    def close(self):
+        """Detach from the reactor selector and close the socket; called on the reactor thread"""
+        if self.sock:
+            try:
+                self.selector.unregister(self.sock)
+            except (KeyError, ValueError):
+                pass
+            self.sock.close()
+    
+    def _handle_audio_packet(self, data, sender_addr):
+        """Queue one received audio packet"""
+        # Update client tracking
+        with self.clients_lock:
+            self.clients[sender_addr] = time.time()
+        
+        # Extract audio data
+        try:
+            version, msg_type, payload_length, seq_num, audio_data = unpack_message(data)
+        except Exception as e:
+            return
+        
+        # Add to client's buffer
+        with self.buffers_lock:
+            if sender_addr not in self.audio_buffers:
+                self.audio_buffers[sender_addr] = deque(maxlen=10)
+            self.audio_buffers[sender_addr].append(audio_data)
+        
+        # Update stats
+        self.stats['total_packets'] += 1
+        self.stats['total_bytes'] += len(data)
+    
     def _audio_mixer(self):
         """Mix audio from all clients and broadcast"""
         print("🎛️  Audio mixer started")
@@ -129,18 +190,16 @@ class AudioConferenceServer:
                     if len(chunks_to_mix) < 2:
                         continue
                 
-                # Mix audio for each client (excluding their own audio)
+                # Sum every stream once, then mix for each client (excluding their own audio)
+                total, streams = self._sum_streams(chunks_to_mix)
+                packets = []
                 for target_addr in clients_to_send:
-                    mixed_audio = self._mix_audio_for_client(chunks_to_mix, target_addr)
+                    mixed_audio = self._mix_audio_for_client(total, streams[target_addr])
                     
                     if mixed_audio:
-                        # Pack and send
-                        packet = pack_message(AUDIO, mixed_audio)
-                        try:
-                            self.sock.sendto(packet, target_addr)
-                            self.stats['mixed_packets'] += 1
-                        except Exception as e:
-                            pass
+                        packets.append((pack_message(AUDIO, mixed_audio), target_addr))
+                
+                self._send_mixes(packets)
                 
                 # Log stats periodically
                 if self.stats['mixed_packets'] % 500 == 0 and self.stats['mixed_packets'] > 0:
@@ -150,33 +209,59 @@ class AudioConferenceServer:
                 if self.running:
                     print(f"⚠️  Mixer error: {e}")
     
-    def _mix_audio_for_client(self, chunks_to_mix, target_addr):
-        """Mix audio from all clients except target"""
-        try:
-            # Convert all chunks to numpy arrays
-            arrays = []
-            for addr, chunk in chunks_to_mix:
-                if addr == target_addr:
-                    continue  # Don't include client's own audio
-                
-                arr = np.frombuffer(chunk, dtype=np.int16)
-                arrays.append(arr)
-            
-            if not arrays:
-                return None
+    def _send_mixes(self, packets):
+        """Send each client its mixed packet"""
+        if self.sender:
+            try:
+                failed = self.sender.send(self.sock, packets)
+                reason = "rejected by the kernel"
+            except Exception as e:
+                failed = packets
+                reason = e
+            self.stats['mixed_packets'] += len(packets) - len(failed)
             
-            # Ensure all arrays are same length (pad if needed)
-            max_len = max(len(arr) for arr in arrays)
-            padded = []
-            for arr in arrays:
-                if len(arr) < max_len:
-                    padded_arr = np.pad(arr, (0, max_len - len(arr)), mode='constant')
-                    padded.append(padded_arr)
-                else:
-                    padded.append(arr)
+            # Log when sends start failing, not once per mixed chunk
+            if failed and self.running and not self._send_failing:
+                print(f"⚠️  Audio send failed for {len(failed)} of {len(packets)} clients: {reason}")
+            self._send_failing = bool(failed)
+            return
+        
+        for packet, target_addr in packets:
+            try:
+                self.sock.sendto(packet, target_addr)
+                self.stats['mixed_packets'] += 1
+            except Exception as e:
+                pass
+    
+    def _sum_streams(self, chunks_to_mix):
+        """Sum all audio streams into the reusable total accumulator
+        
+        Returns the total and {addr: samples} so each client's own stream
+        can be subtracted from it.
+        """
+        streams = {}
+        for addr, chunk in chunks_to_mix:
+            streams[addr] = np.frombuffer(chunk, dtype=np.int16, count=len(chunk) // 2)
+        
+        max_len = max(len(arr) for arr in streams.values())
+        total = self.mix_total[:max_len]
+        total.fill(0)
+        for arr in streams.values():
+            total[:len(arr)] += arr
+        
+        return total, streams
+    
+    def _mix_audio_for_client(self, total, own):
+        """Mix audio from all clients except target (total minus own stream)"""
+        try:
+            acc = self.mix_acc[:len(total)]
+            count = len(own)
+            np.subtract(total[:count], own, out=acc[:count])
+            acc[count:] = total[count:]
             
-            # Mix: average all audio streams
-            mixed = np.mean(padded, axis=0).astype(np.int16)
+            # Saturate to the int16 range, clipping straight into the output
+            mixed = self.mix_out[:len(acc)]
+            np.clip(acc, -32768, 32767, out=mixed, casting='unsafe')
             
             return mixed.tobytes()
             
@@ -184,28 +269,24 @@ class AudioConferenceServer:
             print(f"⚠️  Mix error: {e}")
             return None
     
-    def _cleanup_stale_clients(self):
+    def _cleanup_stale_clients(self, current_time):
         """Remove clients that haven't sent data recently"""
         TIMEOUT = 30  # 30 seconds
         
-        while self.running:
-            time.sleep(10)
-            
-            current_time = time.time()
-            with self.clients_lock:
-                stale = [
-                    addr for addr, last_seen in self.clients.items()
-                    if current_time - last_seen > TIMEOUT
-                ]
-            
-            if stale:
-                with self.buffers_lock:
-                    for addr in stale:
-                        if addr in self.clients:
-                            del self.clients[addr]
-                        if addr in self.audio_buffers:
-                            del self.audio_buffers[addr]
-                        print(f"🔌 Audio client {addr[0]}:{addr[1]} timed out")
+        with self.clients_lock:
+            stale = [
+                addr for addr, last_seen in self.clients.items()
+                if current_time - last_seen > TIMEOUT
+            ]
+        
+        if stale:
+            with self.buffers_lock:
+                for addr in stale:
+                    if addr in self.clients:
+                        del self.clients[addr]
+                    if addr in self.audio_buffers:
+                        del self.audio_buffers[addr]
+                    print(f"🔌 Audio client {addr[0]}:{addr[1]} timed out")
     
     def _log_stats(self):
         """Log server statistics"""
@@ -219,10 +300,8 @@ class AudioConferenceServer:
               f"{active} active clients")
     
     def stop(self):
-        """Stop the server"""
+        """Stop the server; the reactor closes the socket on exit"""
         self.running = False
-        if self.sock:
-            self.sock.close()
         print("🛑 Audio server stopped")
     
     def get_stats(self):
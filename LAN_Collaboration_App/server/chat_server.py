@@ -4,8 +4,8 @@ Manages multi-user text chat with message broadcasting
 Uses TCP for reliable message delivery
 """
 
+import asyncio
 import socket
-import threading
 import sys
 import os
 import time
@@ -13,23 +13,32 @@ from datetime import datetime
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from shared.constants import CHAT_PORT, BUFFER_SIZE, MAX_CONNECTIONS
+from shared.constants import CHAT_PORT, HEADER_SIZE, MAX_MESSAGE_SIZE, MAX_CONNECTIONS, CHAT_SOCKET_BUFFER_SIZE
 from shared.protocol import CHAT, DISCONNECT, USER_LIST
-from shared.helpers import pack_message, unpack_message
+from shared.helpers import pack_message, unpack_header, unpack_message
 import json
 
 
 class ChatServer:
-    """Multi-user chat server with broadcasting"""
+    """Multi-user chat server with broadcasting
+    
+    All connections are served by one asyncio event loop, so no per-client
+    threads or locks are needed.
+    """
     
     def __init__(self, port=CHAT_PORT):
         self.port = port
-        self.server_socket = None
+        self.server = None
+        self.loop = None
         self.running = False
+        self._stop_event = None
+        self._handlers = set()
         
-        # Connected clients: {socket: {'addr': addr, 'username': username, 'connected_at': time}}
+        # Connected clients: {writer: {'addr': addr, 'username': username, 'connected_at': time}}
         self.clients = {}
-        self.clients_lock = threading.Lock()
+        
+        # Snapshot of client writers, rebuilt only on connect/disconnect
+        self._client_tuple = ()
         
         # Statistics
         self.stats = {
@@ -41,205 +50,197 @@ class ChatServer:
     def start(self):
         """Start the chat server"""
         try:
-            # Create TCP socket
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind(('0.0.0.0', self.port))
-            self.server_socket.listen(MAX_CONNECTIONS)
-            self.server_socket.settimeout(1.0)
-            
-            self.running = True
-            
-            print(f"💬 Chat Server listening on TCP port {self.port}")
-            
-            # Accept connections
-            while self.running:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    
-                    with self.clients_lock:
-                        self.stats['total_connections'] += 1
-                        self.stats['current_connections'] += 1
-                    
-                    print(f"✓ New chat connection from {address[0]}:{address[1]}")
-                    
-                    # Start handler thread
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client_socket, address),
-                        daemon=True
-                    )
-                    client_thread.start()
-                    
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if self.running:
-                        print(f"⚠️  Error accepting connection: {e}")
-                        
+            asyncio.run(self._serve())
         except Exception as e:
             print(f"❌ Chat server error: {e}")
         finally:
             self.stop()
     
-    def _handle_client(self, client_socket, address):
+    async def _serve(self):
+        """Accept connections until stop() is called"""
+        self.loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        
+        # Create TCP server (asyncio enables TCP_NODELAY on accepted sockets)
+        self.server = await asyncio.start_server(
+            self._handle_client,
+            '0.0.0.0',
+            self.port,
+            backlog=MAX_CONNECTIONS,
+            reuse_address=True
+        )
+        
+        self.running = True
+        
+        print(f"💬 Chat Server listening on TCP port {self.port}")
+        
+        try:
+            await self._stop_event.wait()
+        finally:
+            self.server.close()
+            
+            # Close all client connections and let their handlers finish
+            for writer in list(self.clients.keys()):
+                writer.close()
+            if self._handlers:
+                await asyncio.wait(self._handlers, timeout=1.0)
+            self.clients.clear()
+            self._client_tuple = ()
+    
+    async def _handle_client(self, reader, writer):
         """Handle a single client connection"""
-        buffer = b""
+        address = writer.get_extra_info('peername')
         username = "Unknown"
         
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        
+        self.stats['total_connections'] += 1
+        self.stats['current_connections'] += 1
+        
+        print(f"✓ New chat connection from {address[0]}:{address[1]}")
+        
+        # Give message bursts room in the kernel buffers
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CHAT_SOCKET_BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CHAT_SOCKET_BUFFER_SIZE)
+        
+        # Add to clients
+        self.clients[writer] = {
+            'addr': address,
+            'username': username,
+            'connected_at': time.time()
+        }
+        self._client_tuple = tuple(self.clients)
+        
         try:
-            # Add to clients
-            with self.clients_lock:
-                self.clients[client_socket] = {
-                    'addr': address,
-                    'username': username,
-                    'connected_at': time.time()
-                }
-            
             # Receive and process messages
             while self.running:
-                data = client_socket.recv(BUFFER_SIZE)
+                header = await reader.readexactly(HEADER_SIZE)
+                payload_length = unpack_header(header)[2]
                 
-                if not data:
-                    break  # Client disconnected
+                if payload_length > MAX_MESSAGE_SIZE:
+                    print(f"⚠️  Message too large from {address[0]}: {payload_length} bytes")
+                    break
                 
-                buffer += data
+                payload = await reader.readexactly(payload_length)
                 
-                # Process complete messages
-                while len(buffer) >= 12:  # Minimum header size
-                    try:
-                        version, msg_type, payload_length, seq_num, payload = unpack_message(buffer)
-                        message_size = 12 + payload_length
-                        
-                        if len(buffer) < message_size:
-                            break  # Wait for more data
-                        
-                        # Process message
-                        if msg_type == CHAT:
-                            message_text = payload.decode('utf-8')
-                            
-                            # Log message
-                            timestamp = datetime.now().strftime("%H:%M:%S")
-                            print(f"[{timestamp}] {message_text}")
-                            
-                            # Extract username from first message (join message)
-                            if username == "Unknown" and ":" in message_text:
-                                username = message_text.split(":", 1)[0].strip()
-                                with self.clients_lock:
-                                    self.clients[client_socket]['username'] = username
-                                # Broadcast updated user list first
-                                self._broadcast_user_list()
-                            
-                            # Broadcast message to ALL clients (including sender for acknowledgment)
-                            self._broadcast_message(message_text, sender=None)
-                            self.stats['messages_sent'] += 1
-                        
-                        elif msg_type == DISCONNECT:
-                            print(f"👋 {username} disconnecting")
-                            break
+                try:
+                    version, msg_type, payload_length, seq_num, payload = unpack_message(header + payload)
+                    
+                    # Process message
+                    if msg_type == CHAT:
+                        message_text = payload.decode('utf-8')
                         
-                        # Remove processed message
-                        buffer = buffer[message_size:]
+                        # Log message
+                        timestamp = datetime.now().strftime("%H:%M:%S")
+                        print(f"[{timestamp}] {message_text}")
                         
-                    except ValueError:
-                        break  # Incomplete message
-                    except Exception as e:
-                        print(f"⚠️  Error processing message: {e}")
-                        buffer = buffer[1:]  # Skip one byte
+                        # Extract username from first message (join message)
+                        if username == "Unknown" and ":" in message_text:
+                            username = message_text.split(":", 1)[0].strip()
+                            if writer in self.clients:
+                                self.clients[writer]['username'] = username
+                            # Broadcast updated user list first
+                            await self._broadcast_user_list()
                         
+                        # Broadcast message to ALL clients (including sender for acknowledgment)
+                        await self._broadcast_message(message_text, sender=None)
+                        self.stats['messages_sent'] += 1
+                    
+                    elif msg_type == DISCONNECT:
+                        print(f"👋 {username} disconnecting")
+                        break
+                
+                except ValueError as e:
+                    print(f"⚠️  Error processing message: {e}")
+        
+        except asyncio.IncompleteReadError:
+            pass  # Client disconnected
         except Exception as e:
             print(f"⚠️  Client {address[0]}:{address[1]} error: {e}")
         finally:
             # Remove client
-            with self.clients_lock:
-                if client_socket in self.clients:
-                    username = self.clients[client_socket]['username']
-                    del self.clients[client_socket]
-                    self.stats['current_connections'] -= 1
+            self.clients.pop(writer, None)
+            self._client_tuple = tuple(self.clients)
+            self.stats['current_connections'] -= 1
             
             # Announce departure and update user list
-            if username != "Unknown":
+            if username != "Unknown" and self.running:
                 leave_msg = f"{username} has left the chat"
-                self._broadcast_message(leave_msg)
-                self._broadcast_user_list()
+                await self._broadcast_message(leave_msg)
+                await self._broadcast_user_list()
             
-            client_socket.close()
+            writer.close()
+            self._handlers.discard(handler)
             print(f"✗ {username} ({address[0]}:{address[1]}) disconnected "
                   f"[{self.stats['current_connections']} remaining]")
     
-    def _broadcast_message(self, message, sender=None):
+    async def _broadcast_message(self, message, sender=None):
         """Broadcast message to all clients except sender"""
         message_bytes = message.encode('utf-8')
         packet = pack_message(CHAT, message_bytes)
         
-        with self.clients_lock:
-            disconnected = []
-            
-            for client_socket in list(self.clients.keys()):
-                if client_socket == sender:
-                    continue  # Don't echo back to sender
-                
-                try:
-                    client_socket.sendall(packet)
-                except Exception as e:
-                    disconnected.append(client_socket)
-            
-            # Remove disconnected clients
-            for socket in disconnected:
-                if socket in self.clients:
-                    del self.clients[socket]
+        targets = self._client_tuple
+        if sender is not None:
+            targets = tuple(writer for writer in targets if writer is not sender)
+        await self._send_to_clients(targets, packet)
     
-    def _broadcast_user_list(self):
+    async def _broadcast_user_list(self):
         """Broadcast updated user list to all clients"""
-        with self.clients_lock:
-            usernames = [info['username'] for info in self.clients.values() if info['username'] != "Unknown"]
+        usernames = [info['username'] for info in self.clients.values() if info['username'] != "Unknown"]
         
         user_list_data = json.dumps(usernames).encode('utf-8')
         packet = pack_message(USER_LIST, user_list_data)
         
-        with self.clients_lock:
-            disconnected = []
-            
-            for client_socket in list(self.clients.keys()):
-                try:
-                    client_socket.sendall(packet)
-                except Exception as e:
-                    disconnected.append(client_socket)
-            
-            # Remove disconnected clients
-            for socket in disconnected:
-                if socket in self.clients:
-                    del self.clients[socket]
+        await self._send_to_clients(self._client_tuple, packet)
+    
+    async def _send_to_clients(self, targets, packet):
+        """Queue packet on every target, then wait for all of them to drain"""
+        results = await asyncio.gather(
+            *(self._send(writer, packet) for writer in targets),
+            return_exceptions=True
+        )
+        
+        # Remove disconnected clients
+        removed = False
+        for writer, result in zip(targets, results):
+            if isinstance(result, Exception) and writer in self.clients:
+                del self.clients[writer]
+                removed = True
+        if removed:
+            self._client_tuple = tuple(self.clients)
+    
+    async def _send(self, writer, packet):
+        """Send packet to a single client"""
+        writer.write(packet)
+        await writer.drain()
     
     def stop(self):
-        """Stop the server"""
+        """Stop the server (safe to call from any thread)"""
         print("\n🛑 Shutting down chat server...")
         self.running = False
         
-        # Close all client connections
-        with self.clients_lock:
-            for client_socket in list(self.clients.keys()):
-                try:
-                    client_socket.close()
-                except:
-                    pass
-            self.clients.clear()
-        
-        # Close server socket
-        if self.server_socket:
-            self.server_socket.close()
+        # Wake the event loop; it closes the listener and all clients
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                pass  # Loop closed in the meantime
         
         print("🛑 Chat server stopped")
     
     def get_stats(self):
         """Get server statistics"""
-        with self.clients_lock:
-            return {
-                'current_connections': self.stats['current_connections'],
-                'total_connections': self.stats['total_connections'],
-                'messages_sent': self.stats['messages_sent'],
-                'users': [info['username'] for info in self.clients.values()]
-            }
+        clients = list(self.clients.values())
+        return {
+            'current_connections': self.stats['current_connections'],
+            'total_connections': self.stats['total_connections'],
+            'messages_sent': self.stats['messages_sent'],
+            'users': [info['username'] for info in clients]
+        }
 
 
 if __name__ == '__main__':
@@ -10,21 +10,23 @@ import sys
 import os
 import time
 import hashlib
+import queue
 from pathlib import Path
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from shared.constants import (
     FILE_TRANSFER_PORT, FILE_CHUNK_SIZE, 
-    MAX_FILE_SIZE, BUFFER_SIZE
+    MAX_FILE_SIZE, MAX_MESSAGE_SIZE, BUFFER_SIZE, HEADER_SIZE,
+    FILE_SOCKET_BUFFER_SIZE, MAX_CONNECTIONS, PROTOCOL_VERSION,
+    CONNECTION_TIMEOUT
 )
 from shared.protocol import FILE_UPLOAD, FILE_DOWNLOAD, FILE_METADATA, FILE_CHUNK
 from shared.helpers import (
-    pack_message, unpack_message,
+    pack_message, pack_header, unpack_header,
     pack_file_metadata, unpack_file_metadata
 )
 
-
 class FileTransferServer:
     """Multi-user file transfer server"""
     
@@ -36,6 +38,10 @@ class FileTransferServer:
         self.server_socket = None
         self.running = False
         
+        # Accepted connections, served by a fixed set of worker threads
+        self._connections = queue.SimpleQueue()
+        self._workers = []
+        
         # Statistics
         self.stats = {
             'files_uploaded': 0,
@@ -45,6 +51,10 @@ class FileTransferServer:
             'active_transfers': 0
         }
         self.stats_lock = threading.Lock()
+        
+        # Checksums of stored files: {path: (mtime_ns, size, md5)}
+        self.checksums = {}
+        self.checksums_lock = threading.Lock()
     
     def start(self):
         """Start the file transfer server"""
@@ -53,11 +63,20 @@ class FileTransferServer:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind(('0.0.0.0', self.port))
-            self.server_socket.listen(5)
+            self.server_socket.listen(socket.SOMAXCONN)
             self.server_socket.settimeout(1.0)
             
             self.running = True
             
+            for i in range(MAX_CONNECTIONS):
+                worker = threading.Thread(
+                    target=self._transfer_worker,
+                    name=f"file-transfer-{i}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+            
             print(f"📁 File Transfer Server listening on TCP port {self.port}")
             print(f"💾 Storage directory: {self.storage_dir.absolute()}")
             
@@ -68,13 +87,13 @@ class FileTransferServer:
                     
                     print(f"✓ File transfer connection from {address[0]}:{address[1]}")
                     
-                    # Handle in new thread
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client_socket, address),
-                        daemon=True
-                    )
-                    client_thread.start()
+                    # Hand off to the next free worker
+                    with self.stats_lock:
+                        busy = self.stats['active_transfers'] >= MAX_CONNECTIONS
+                    if busy:
+                        print(f"⏳ All {MAX_CONNECTIONS} transfer workers busy; "
+                              f"{address[0]}:{address[1]} queued")
+                    self._connections.put((client_socket, address))
                     
                 except socket.timeout:
                     continue
@@ -87,20 +106,41 @@ class FileTransferServer:
         finally:
             self.stop()
     
+    def _transfer_worker(self):
+        """Serve queued connections until stop() sends None"""
+        while True:
+            connection = self._connections.get()
+            if connection is None:
+                return
+            
+            self._handle_client(*connection)
+    
     def _handle_client(self, client_socket, address):
         """Handle file transfer client"""
         try:
             with self.stats_lock:
                 self.stats['active_transfers'] += 1
             
+            # Bulk transfer: no Nagle delays, large kernel buffers
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, FILE_SOCKET_BUFFER_SIZE)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, FILE_SOCKET_BUFFER_SIZE)
+            
+            # A client that stalls must not hold a worker forever
+            client_socket.settimeout(CONNECTION_TIMEOUT)
+            
             # Receive first message to determine operation
-            header = self._recv_exact(client_socket, 12)
+            header = self._recv_exact(client_socket, HEADER_SIZE)
             if not header:
                 return
             
             # Parse message type
-            import struct
-            msg_type = struct.unpack('!B', header[1:2])[0]
+            version, msg_type, payload_length = unpack_header(header)[:3]
+            
+            # Validate before reading the payload: its length sizes the receive buffer
+            if version != PROTOCOL_VERSION or payload_length > MAX_MESSAGE_SIZE:
+                print(f"⚠️  Invalid message header from {address[0]}")
+                return
             
             if msg_type == FILE_METADATA:
                 # This is an upload
@@ -122,8 +162,7 @@ class FileTransferServer:
         """Handle file upload"""
         try:
             # Receive metadata payload
-            import struct
-            payload_length = struct.unpack('!I', header[2:6])[0]
+            payload_length = unpack_header(header)[2]
             metadata_payload = self._recv_exact(client_socket, payload_length)
             
             if not metadata_payload:
@@ -146,33 +185,49 @@ class FileTransferServer:
             file_path = self.storage_dir / filename
             bytes_received = 0
             
+            # Hash while receiving instead of re-reading the file afterwards
+            md5_hash = hashlib.md5()
+            
+            # Reusable receive buffer for chunk payloads
+            chunk_buffer = bytearray(FILE_CHUNK_SIZE)
+            
             with open(file_path, 'wb') as f:
                 while bytes_received < filesize:
                     # Receive chunk message
-                    chunk_header = self._recv_exact(client_socket, 12)
+                    chunk_header = self._recv_exact(client_socket, HEADER_SIZE)
                     if not chunk_header:
                         break
                     
-                    chunk_length = struct.unpack('!I', chunk_header[2:6])[0]
-                    chunk_data = self._recv_exact(client_socket, chunk_length)
+                    version, _, chunk_length = unpack_header(chunk_header)[:3]
+                    if version != PROTOCOL_VERSION:
+                        print(f"❌ Protocol version mismatch in chunk from {address[0]}")
+                        break
                     
-                    if not chunk_data:
+                    if chunk_length > MAX_MESSAGE_SIZE:
+                        print(f"❌ Chunk too large: {chunk_length} > {MAX_MESSAGE_SIZE}")
                         break
                     
-                    # Extract payload from message
-                    _, _, _, _, payload = unpack_message(chunk_header + chunk_data)
+                    if chunk_length > len(chunk_buffer):
+                        chunk_buffer = bytearray(chunk_length)
+                    
+                    # Receive payload in place and write it without copying
+                    payload = memoryview(chunk_buffer)[:chunk_length]
+                    if not self._recv_into(client_socket, payload):
+                        break
                     
                     # Write to file
+                    md5_hash.update(payload)
                     f.write(payload)
-                    bytes_received += len(payload)
+                    bytes_received += chunk_length
             
             # Verify checksum if provided
-            if checksum:
-                actual_checksum = self._calculate_md5(file_path)
-                if actual_checksum != checksum:
-                    print(f"⚠️  Checksum mismatch for {filename}")
-                    os.remove(file_path)
-                    return
+            actual_checksum = md5_hash.hexdigest()
+            if checksum and actual_checksum != checksum:
+                print(f"⚠️  Checksum mismatch for {filename}")
+                os.remove(file_path)
+                return
+            
+            self._store_checksum(file_path, actual_checksum)
             
             # Send acknowledgment
             try:
@@ -194,8 +249,7 @@ class FileTransferServer:
         """Handle file download"""
         try:
             # Receive filename request
-            import struct
-            payload_length = struct.unpack('!I', header[2:6])[0]
+            payload_length = unpack_header(header)[2]
             filename_bytes = self._recv_exact(client_socket, payload_length)
             
             if not filename_bytes:
@@ -212,26 +266,16 @@ class FileTransferServer:
             
             # Get file info
             filesize = file_path.stat().st_size
-            checksum = self._calculate_md5(file_path)
+            checksum = self._get_checksum(file_path)
             
             # Send metadata
             metadata = pack_file_metadata(filename, filesize, checksum)
             metadata_packet = pack_message(FILE_METADATA, metadata)
             client_socket.sendall(metadata_packet)
             
-            # Send file data
-            bytes_sent = 0
+            # Send file data as a single FILE_CHUNK frame
             with open(file_path, 'rb') as f:
-                while bytes_sent < filesize:
-                    chunk = f.read(FILE_CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    
-                    # Pack and send chunk
-                    chunk_packet = pack_message(FILE_CHUNK, chunk)
-                    client_socket.sendall(chunk_packet)
-                    
-                    bytes_sent += len(chunk)
+                bytes_sent = self._send_file_data(client_socket, f, filesize)
             
             with self.stats_lock:
                 self.stats['files_downloaded'] += 1
@@ -242,15 +286,69 @@ class FileTransferServer:
         except Exception as e:
             print(f"❌ Download error: {e}")
     
+    def _send_file_data(self, client_socket, f, filesize):
+        """Send file contents after a single framing header
+        
+        Uses socket.sendfile (sendfile(2) on Linux) so the data goes from
+        the page cache to the socket without passing through Python.
+        """
+        client_socket.sendall(pack_header(FILE_CHUNK, filesize))
+        
+        try:
+            return client_socket.sendfile(f, offset=0, count=filesize)
+        except OSError as e:
+            # sendfile not usable on this socket (e.g. TLS-wrapped),
+            # send the remaining bytes the regular way
+            print(f"⚠️  sendfile failed, falling back to send: {e}")
+        
+        bytes_sent = f.tell()
+        while bytes_sent < filesize:
+            chunk = f.read(min(FILE_CHUNK_SIZE, filesize - bytes_sent))
+            if not chunk:
+                break
+            
+            client_socket.sendall(chunk)
+            bytes_sent += len(chunk)
+        
+        return bytes_sent
+    
     def _recv_exact(self, sock, num_bytes):
         """Receive exactly num_bytes"""
-        data = b''
-        while len(data) < num_bytes:
-            chunk = sock.recv(min(num_bytes - len(data), BUFFER_SIZE))
-            if not chunk:
-                return None
-            data += chunk
-        return data
+        buffer = bytearray(num_bytes)
+        if not self._recv_into(sock, memoryview(buffer)):
+            return None
+        return bytes(buffer)
+    
+    def _recv_into(self, sock, view):
+        """Fill a writable memoryview from the socket, False if connection closed"""
+        offset = 0
+        num_bytes = len(view)
+        while offset < num_bytes:
+            received = sock.recv_into(view[offset:], min(num_bytes - offset, BUFFER_SIZE))
+            if not received:
+                return False
+            offset += received
+        return True
+    
+    def _get_checksum(self, file_path):
+        """Get MD5 checksum of a stored file, reusing the cached value"""
+        stat = file_path.stat()
+        
+        with self.checksums_lock:
+            cached = self.checksums.get(file_path)
+        
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        
+        checksum = self._calculate_md5(file_path)
+        self._store_checksum(file_path, checksum)
+        return checksum
+    
+    def _store_checksum(self, file_path, checksum):
+        """Cache checksum of a stored file"""
+        stat = file_path.stat()
+        with self.checksums_lock:
+            self.checksums[file_path] = (stat.st_mtime_ns, stat.st_size, checksum)
     
     def _calculate_md5(self, file_path):
         """Calculate MD5 checksum"""
@@ -265,6 +363,11 @@ class FileTransferServer:
         self.running = False
         if self.server_socket:
             self.server_socket.close()
+        
+        # Workers exit once they finish their current transfer
+        for _ in self._workers:
+            self._connections.put(None)
+        self._workers = []
         print("🛑 File server stopped")
     
     def get_stats(self):
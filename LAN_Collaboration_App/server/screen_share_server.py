@@ -5,25 +5,117 @@ Uses TCP for reliable screen frame delivery
 """
 
 import socket
+import selectors
 import threading
 import sys
 import os
 import time
 import struct
+import io
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from shared.constants import SCREEN_SHARE_PORT, BUFFER_SIZE
+from shared.constants import (
+    SCREEN_SHARE_PORT, BUFFER_SIZE,
+    SCREEN_QUEUE_LIMIT, SCREEN_SOCKET_BUFFER_SIZE
+)
 from shared.protocol import SCREEN_SHARE
-from shared.helpers import unpack_message
+from shared.helpers import pack_message, unpack_message
+from shared.reactor import Reactor
+
+# Seconds a new connection may stay silent before it is treated as a viewer
+ROLE_TIMEOUT = 3.0
+
+# Largest frame a presenter may send
+MAX_FRAME_SIZE = 10 * 1024 * 1024
+
+# recv_into calls per readable event before yielding to other sockets
+PRESENTER_READS_PER_WAKEUP = 64
+
+# Frame size prefix, compiled once instead of on every frame
+_SIZE_STRUCT = struct.Struct('!I')
+
+# Linux: keep frames in memory files and let the kernel send them
+HAVE_MEMFD = hasattr(os, 'memfd_create') and hasattr(os, 'sendfile')
+
+
+class _FrameFile:
+    """Screen frame written once to an anonymous memory file
+    
+    Viewers send it with os.sendfile, so the kernel copies straight from
+    these pages instead of from a Python buffer per viewer. The file is
+    closed when the last viewer queue lets go of the frame.
+    """
+    
+    __slots__ = ('fd', 'size')
+    
+    def __init__(self, frame_data):
+        self.fd = -1
+        self.fd = os.memfd_create('screen-frame', os.MFD_CLOEXEC)
+        self.size = len(frame_data)
+        
+        view = memoryview(frame_data)
+        written = 0
+        while written < self.size:
+            written += os.write(self.fd, view[written:])
+    
+    def __len__(self):
+        return self.size
+    
+    def __del__(self):
+        if self.fd >= 0:
+            os.close(self.fd)
 
 
 class ScreenShareServer:
-    """Multi-user screen sharing server"""
+    """Multi-user screen sharing server
+    
+    Runs as a Reactor service, so one thread serves every connection
+    through a selector (shared with other services under server_main):
+    it accepts clients, reads presenter frames and flushes per-viewer send
+    queues, so a slow viewer only backs up its own queue. When several
+    viewers are writable at once their sends run on a small thread pool.
     
-    def __init__(self, port=SCREEN_SHARE_PORT):
+    With transcode=True, frames are downscaled and re-encoded as WebP on a
+    worker thread before they are broadcast (requires Pillow).
+    """
+    
+    def __init__(self, port=SCREEN_SHARE_PORT,
+                 send_buffer_size=SCREEN_SOCKET_BUFFER_SIZE,
+                 recv_buffer_size=SCREEN_SOCKET_BUFFER_SIZE,
+                 transcode=False, max_dim=1280, webp_quality=70):
         self.port = port
+        self.send_buffer_size = send_buffer_size
+        self.recv_buffer_size = recv_buffer_size
+        
+        # Optional WebP transcoding
+        if transcode and not HAVE_PIL:
+            print("⚠️  Pillow not installed, screen frames will not be transcoded")
+        self.transcode = transcode and HAVE_PIL
+        self.max_dim = max_dim
+        self.webp_quality = webp_quality
+        self._transcode_queue = queue.Queue(maxsize=2)
+        self._transcoded = deque()
+        self._wakeup_recv = None
+        self._wakeup_send = None
+        
+        # Log messages from the reactor, printed by a background thread
+        self._log_q = deque(maxlen=4096)
+        self._log_event = threading.Event()
+        
         self.server_socket = None
+        self.selector = None
+        self.send_pool = None
+        self._writable = None  # Viewers reported writable in this reactor pass
         self.running = False
         
         # Track presenters and viewers
@@ -31,203 +123,488 @@ class ScreenShareServer:
         self.viewers = {}     # {socket: address}
         self.lock = threading.Lock()
         
+        # Per-connection state: {socket: {'role': str, 'addr': address,
+        #   'header': bytearray, 'frame': bytearray or None, 'filled': int}}
+        self.connections = {}
+        
+        # Connections whose role is not known yet: {socket: connected_at}
+        self.pending = {}
+        
+        # Per-viewer send queues: {socket: {'queue': deque, 'offset': int, 'queued': int}}
+        self.viewer_queues = {}
+        
         # Statistics
         self.stats = {
             'frames_relayed': 0,
             'bytes_relayed': 0,
+            'frames_dropped': 0,
             'total_connections': 0
         }
     
     def start(self):
         """Start the screen share server"""
         try:
-            # Create TCP socket
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind(('0.0.0.0', self.port))
-            self.server_socket.listen(10)
-            self.server_socket.settimeout(1.0)
-            
-            self.running = True
-            
-            print(f"🖥️  Screen Share Server listening on TCP port {self.port}")
-            
-            # Accept connections
-            while self.running:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    
-                    self.stats['total_connections'] += 1
-                    
-                    print(f"✓ Screen share connection from {address[0]}:{address[1]}")
-                    
-                    # Handle in new thread
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client_socket, address),
-                        daemon=True
-                    )
-                    client_thread.start()
-                    
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if self.running:
-                        print(f"⚠️  Error accepting connection: {e}")
-                        
+            reactor = Reactor()
+            reactor.add(self)
+            reactor.run()
         except Exception as e:
             print(f"❌ Screen share server error: {e}")
         finally:
             self.stop()
     
-    def _handle_client(self, client_socket, address):
-        """Handle screen share client (presenter or viewer)"""
-        is_presenter = False
+    def register(self, selector):
+        """Open the listening socket and register it with a reactor selector"""
+        # Create TCP socket
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind(('0.0.0.0', self.port))
+        self.server_socket.listen(10)
+        self.server_socket.setblocking(False)
+        
+        self.selector = selector
+        self.selector.register(self.server_socket, selectors.EVENT_READ, data=self)
+        
+        # socket.send releases the GIL, so viewer sends can overlap
+        self.send_pool = ThreadPoolExecutor(
+            max_workers=min(8, (os.cpu_count() or 1) * 2),
+            thread_name_prefix='screen-send'
+        )
+        
+        self.running = True
+        
+        log_thread = threading.Thread(target=self._log_writer, daemon=True)
+        log_thread.start()
+        
+        # Transcoded frames come back to the reactor through a socketpair
+        if self.transcode:
+            self._wakeup_recv, self._wakeup_send = socket.socketpair()
+            self._wakeup_recv.setblocking(False)
+            self._wakeup_send.setblocking(False)
+            self.selector.register(self._wakeup_recv, selectors.EVENT_READ, data=self)
+            
+            transcode_thread = threading.Thread(target=self._transcode_worker, daemon=True)
+            transcode_thread.start()
+        
+        print(f"🖥️  Screen Share Server listening on TCP port {self.port}")
+    
+    def handle(self, key, mask):
+        """Dispatch one ready socket"""
+        sock = key.fileobj
+        
+        if sock is self.server_socket:
+            self._accept_client()
+            return
+        
+        if sock is self._wakeup_recv:
+            self._broadcast_transcoded()
+            return
+        
+        if mask & selectors.EVENT_READ:
+            self._handle_readable(sock)
+        
+        if mask & selectors.EVENT_WRITE:
+            if self._writable is None:
+                self._writable = []
+            self._writable.append(sock)
+    
+    def after_select(self):
+        """Flush viewers that became writable and settle connection roles"""
+        if self._writable:
+            writable, self._writable = self._writable, None
+            self._flush_viewers(writable)
+        
+        self._promote_viewers()
+    
+    def close(self):
+        """Close every connection; called on the reactor thread"""
+        self._close_all()
+    
+    def _accept_client(self):
+        """Accept every pending presenter or viewer connection"""
+        while True:
+            try:
+                client_socket, address = self.server_socket.accept()
+            except BlockingIOError:
+                return
+            
+            self._add_connection(client_socket, address)
+    
+    def _add_connection(self, client_socket, address):
+        """Start tracking a newly accepted connection"""
+        client_socket.setblocking(False)
+        self._tune_socket(client_socket)
+        
+        self.stats['total_connections'] += 1
+        
+        self._log(f"✓ Screen share connection from {address[0]}:{address[1]}")
         
+        # Presenters send frames right away, viewers just wait
+        self.connections[client_socket] = {
+            'role': 'unknown',
+            'addr': address,
+            'header': bytearray(_SIZE_STRUCT.size),
+            'frame': None,
+            'filled': 0
+        }
+        self.pending[client_socket] = time.time()
+        self.selector.register(client_socket, selectors.EVENT_READ, data=self)
+    
+    def _tune_socket(self, client_socket):
+        """Send frames immediately, give bursts room in the kernel buffers
+        and detect dead peers with TCP keepalive"""
         try:
-            client_socket.settimeout(1.0)
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.recv_buffer_size)
+            if hasattr(socket, 'TCP_QUICKACK'):
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+            
+            # Let the kernel probe idle peers so a vanished viewer shows up
+            # as a socket error in the reactor
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, 'TCP_KEEPIDLE'):
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+            if hasattr(socket, 'TCP_KEEPINTVL'):
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+            if hasattr(socket, 'TCP_KEEPCNT'):
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+        except OSError as e:
+            self._log(f"⚠️  Could not tune screen share socket: {e}")
+    
+    def _promote_viewers(self):
+        """Treat connections that stayed silent as viewers"""
+        if not self.pending:
+            return
+        
+        now = time.time()
+        for client_socket, connected_at in list(self.pending.items()):
+            if now - connected_at < ROLE_TIMEOUT:
+                continue
             
-            # Wait for first frame to determine if presenter or viewer
-            # Presenters send frames, viewers just wait
+            del self.pending[client_socket]
+            state = self.connections[client_socket]
+            state['role'] = 'viewer'
+            self.viewer_queues[client_socket] = {'queue': deque(), 'offset': 0, 'queued': 0}
             
+            with self.lock:
+                self.viewers[client_socket] = state['addr']
+            
+            self._log(f"👁️  Viewer connected: {state['addr'][0]}:{state['addr'][1]}")
+    
+    def _handle_readable(self, client_socket):
+        """Read from a presenter, or detect a closed connection"""
+        state = self.connections.get(client_socket)
+        if state is None:
+            return
+        
+        if state['role'] == 'viewer':
+            # Viewers never send frames; readable means closed or failed
             try:
-                # Try to receive frame size (4 bytes)
-                size_data = self._recv_with_timeout(client_socket, 4, timeout=3.0)
-                
-                if size_data:
-                    # This is a presenter sending frames
-                    is_presenter = True
-                    with self.lock:
-                        self.presenters[client_socket] = address
-                    
-                    print(f"🎬 Presenter connected: {address[0]}:{address[1]}")
-                    self._handle_presenter(client_socket, address, size_data)
-                else:
-                    # This is a viewer waiting for frames
-                    with self.lock:
-                        self.viewers[client_socket] = address
-                    
-                    print(f"👁️  Viewer connected: {address[0]}:{address[1]}")
-                    self._handle_viewer(client_socket, address)
-                    
-            except socket.timeout:
-                # No data received, assume viewer
-                with self.lock:
-                    self.viewers[client_socket] = address
-                
-                print(f"👁️  Viewer connected: {address[0]}:{address[1]}")
-                self._handle_viewer(client_socket, address)
-                
-        except Exception as e:
-            print(f"⚠️  Error handling client {address[0]}: {e}")
-        finally:
-            # Remove from tracking
+                if client_socket.recv(BUFFER_SIZE):
+                    return
+            except BlockingIOError:
+                return
+            except OSError:
+                pass
+            self._close_connection(client_socket)
+            return
+        
+        # Drain what the presenter has queued in this wakeup, so a burst costs
+        # one selector event instead of one per recv; capped so one busy
+        # presenter cannot starve the other sockets
+        for _ in range(PRESENTER_READS_PER_WAKEUP):
+            if not self._read_presenter(client_socket, state):
+                break
+    
+    def _read_presenter(self, client_socket, state):
+        """Read once from a presenter; True if more data may be waiting"""
+        # Fill the size prefix first, then the frame buffer, in place
+        if state['frame'] is None:
+            view = memoryview(state['header'])[state['filled']:]
+        else:
+            view = memoryview(state['frame'])[state['filled']:]
+        
+        try:
+            count = client_socket.recv_into(view)
+        except BlockingIOError:
+            return False
+        except OSError:
+            count = 0
+        
+        if not count:
+            self._close_connection(client_socket)
+            return False
+        
+        # A short read means the socket buffer is empty
+        more = count == len(view)
+        
+        if state['role'] == 'unknown':
+            # This is a presenter sending frames
+            state['role'] = 'presenter'
+            self.pending.pop(client_socket, None)
             with self.lock:
-                if client_socket in self.presenters:
-                    del self.presenters[client_socket]
-                    print(f"🎬 Presenter disconnected: {address[0]}:{address[1]}")
-                if client_socket in self.viewers:
-                    del self.viewers[client_socket]
-                    print(f"👁️  Viewer disconnected: {address[0]}:{address[1]}")
+                self.presenters[client_socket] = state['addr']
+            
+            self._log(f"🎬 Presenter connected: {state['addr'][0]}:{state['addr'][1]}")
+        
+        state['filled'] += count
+        
+        if state['frame'] is None:
+            if state['filled'] < _SIZE_STRUCT.size:
+                return more
+            
+            frame_size = _SIZE_STRUCT.unpack_from(state['header'])[0]
+            
+            # Validate size
+            if frame_size > MAX_FRAME_SIZE:
+                self._log(f"⚠️  Frame too large: {frame_size}")
+                self._close_connection(client_socket)
+                return False
             
-            client_socket.close()
+            # The frame buffer keeps the size prefix so it is broadcast as-is
+            state['frame'] = bytearray(_SIZE_STRUCT.size + frame_size)
+            state['frame'][:_SIZE_STRUCT.size] = state['header']
+        
+        frame_data = state['frame']
+        if state['filled'] < len(frame_data):
+            return more
+        
+        state['frame'] = None
+        state['filled'] = 0
+        
+        # Broadcast to all viewers
+        if self.transcode:
+            self._queue_transcode(frame_data)
+        else:
+            self._broadcast_frame(frame_data, client_socket)
+        
+        # Update stats
+        self.stats['frames_relayed'] += 1
+        self.stats['bytes_relayed'] += len(frame_data) - _SIZE_STRUCT.size
+        
+        # Log stats periodically
+        if self.stats['frames_relayed'] % 100 == 0:
+            self._log_stats()
+        
+        return more
     
-    def _handle_presenter(self, client_socket, address, first_size_data):
-        """Handle presenter sending screen frames"""
+    def _broadcast_frame(self, frame_data, sender_socket):
+        """Queue frame for all viewers"""
+        if not self.viewer_queues:
+            return
+        
+        if HAVE_MEMFD:
+            frame = _FrameFile(frame_data)
+        else:
+            frame = memoryview(frame_data)
+        
+        for viewer_socket, state in self.viewer_queues.items():
+            if viewer_socket is sender_socket:
+                continue
+            
+            # Drop the oldest unsent frames of a slow viewer to bound memory;
+            # a frame that is partially sent must be finished first
+            queue = state['queue']
+            first = 1 if state['offset'] else 0
+            while len(queue) > first and state['queued'] + len(frame) > SCREEN_QUEUE_LIMIT:
+                state['queued'] -= len(queue[first])
+                del queue[first]
+                self.stats['frames_dropped'] += 1
+            
+            queue.append(frame)
+            state['queued'] += len(frame)
+            
+            # Queue was empty, start watching for writability
+            if len(queue) == 1:
+                self.selector.modify(viewer_socket, selectors.EVENT_READ | selectors.EVENT_WRITE, data=self)
+    
+    def _queue_transcode(self, frame_data):
+        """Hand a frame to the transcode worker, dropping the oldest if it lags"""
         try:
-            # Process first frame
-            frame_size = struct.unpack('!I', first_size_data)[0]
-            frame_data = self._recv_exact(client_socket, frame_size)
+            self._transcode_queue.put_nowait(frame_data)
+        except queue.Full:
+            try:
+                self._transcode_queue.get_nowait()
+                self.stats['frames_dropped'] += 1
+            except queue.Empty:
+                pass
+            self._transcode_queue.put_nowait(frame_data)
+    
+    def _transcode_worker(self):
+        """Re-encode queued frames off the reactor thread"""
+        while self.running:
+            try:
+                frame_data = self._transcode_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
             
-            if frame_data:
-                self._broadcast_frame(first_size_data + frame_data, client_socket)
+            self._transcoded.append(self._transcode_frame(frame_data))
+            try:
+                self._wakeup_send.send(b'\0')
+            except (BlockingIOError, OSError):
+                pass  # Already pending, or shutting down
+    
+    def _transcode_frame(self, frame_data):
+        """Downscale a frame and re-encode it as WebP
+        
+        Returns the original frame if it cannot be decoded or WebP is not smaller.
+        """
+        try:
+            version, msg_type, payload_length, seq_num, payload = unpack_message(
+                bytes(frame_data[_SIZE_STRUCT.size:])
+            )
             
-            # Receive and broadcast subsequent frames
-            while self.running:
-                # Receive frame size
-                size_data = self._recv_exact(client_socket, 4)
-                if not size_data:
-                    break
-                
-                frame_size = struct.unpack('!I', size_data)[0]
-                
-                # Validate size
-                if frame_size > 10 * 1024 * 1024:  # Max 10MB
-                    print(f"⚠️  Frame too large: {frame_size}")
-                    break
-                
-                # Receive frame data
-                frame_data = self._recv_exact(client_socket, frame_size)
-                if not frame_data:
-                    break
-                
-                # Broadcast to all viewers
-                self._broadcast_frame(size_data + frame_data, client_socket)
-                
-                # Update stats
-                self.stats['frames_relayed'] += 1
-                self.stats['bytes_relayed'] += len(frame_data)
-                
-                # Log stats periodically
-                if self.stats['frames_relayed'] % 100 == 0:
-                    self._log_stats()
-                    
+            img = Image.open(io.BytesIO(payload))
+            img.thumbnail((self.max_dim, self.max_dim))
+            
+            out = io.BytesIO()
+            img.save(out, 'WEBP', quality=self.webp_quality, method=4)
+            packet = pack_message(msg_type, out.getvalue())
         except Exception as e:
-            print(f"⚠️  Presenter error: {e}")
+            return frame_data
+        
+        if _SIZE_STRUCT.size + len(packet) >= len(frame_data):
+            return frame_data
+        
+        return _SIZE_STRUCT.pack(len(packet)) + packet
     
-    def _handle_viewer(self, client_socket, address):
-        """Handle viewer waiting for frames"""
-        # Viewers are passive - they just receive frames from broadcast
-        # Keep connection alive
+    def _broadcast_transcoded(self):
+        """Broadcast frames finished by the transcode worker"""
         try:
-            while self.running:
-                time.sleep(1)
-                # Check if socket is still connected
-                try:
-                    client_socket.send(b'')
-                except:
-                    break
-        except Exception as e:
+            while self._wakeup_recv.recv(BUFFER_SIZE):
+                pass
+        except BlockingIOError:
             pass
+        
+        while self._transcoded:
+            self._broadcast_frame(self._transcoded.popleft(), None)
     
-    def _broadcast_frame(self, frame_data, sender_socket):
-        """Broadcast frame to all viewers"""
-        with self.lock:
-            disconnected = []
-            
-            for viewer_socket in list(self.viewers.keys()):
-                if viewer_socket == sender_socket:
-                    continue
-                
-                try:
-                    viewer_socket.sendall(frame_data)
-                except Exception as e:
-                    disconnected.append(viewer_socket)
-            
-            # Remove disconnected viewers
-            for socket in disconnected:
-                if socket in self.viewers:
-                    addr = self.viewers[socket]
-                    del self.viewers[socket]
-                    print(f"👁️  Viewer disconnected (broadcast failed): {addr[0]}")
-    
-    def _recv_exact(self, sock, num_bytes):
-        """Receive exactly num_bytes"""
-        data = b''
-        while len(data) < num_bytes:
-            chunk = sock.recv(min(num_bytes - len(data), BUFFER_SIZE))
-            if not chunk:
-                return None
-            data += chunk
-        return data
-    
-    def _recv_with_timeout(self, sock, num_bytes, timeout=1.0):
-        """Receive with timeout"""
-        sock.settimeout(timeout)
+    def _flush_viewers(self, viewer_sockets):
+        """Flush writable viewers, in parallel when more than one is ready"""
+        if len(viewer_sockets) == 1:
+            # Common case: no filtering, no pool, no result lists
+            viewer_socket = viewer_sockets[0]
+            if viewer_socket in self.viewer_queues:
+                self._finish_flush(viewer_socket, self._send_queued(viewer_socket))
+            return
+        
+        viewer_sockets = [sock for sock in viewer_sockets if sock in self.viewer_queues]
+        results = self.send_pool.map(self._send_queued, viewer_sockets)
+        
+        for viewer_socket, drained in zip(viewer_sockets, results):
+            self._finish_flush(viewer_socket, drained)
+    
+    def _finish_flush(self, viewer_socket, drained):
+        """Apply a flush result; selector changes stay on the reactor thread"""
+        if drained is None:
+            self._close_connection(viewer_socket, "broadcast failed")
+        elif drained:
+            # Queue drained, stop watching for writability
+            self.selector.modify(viewer_socket, selectors.EVENT_READ, data=self)
+    
+    def _send_queued(self, viewer_socket):
+        """Send as much queued data as the viewer's socket buffer accepts
+        
+        Returns:
+            bool: True if the queue was drained, False if data is left,
+                  None if the connection failed
+        """
+        state = self.viewer_queues[viewer_socket]
+        queue = state['queue']
+        
         try:
-            return self._recv_exact(sock, num_bytes)
-        except socket.timeout:
+            while queue:
+                frame = queue[0]
+                offset = state['offset']
+                if HAVE_MEMFD:
+                    sent = os.sendfile(viewer_socket.fileno(), frame.fd, offset, len(frame) - offset)
+                else:
+                    sent = viewer_socket.send(frame[offset:])
+                
+                state['offset'] += sent
+                if state['offset'] < len(frame):
+                    return False  # Socket buffer full, wait for EVENT_WRITE
+                
+                queue.popleft()
+                state['queued'] -= len(frame)
+                state['offset'] = 0
+        except BlockingIOError:
+            return False
+        except OSError:
             return None
+        
+        return True
+    
+    def _close_connection(self, client_socket, reason="closed"):
+        """Unregister and close a presenter or viewer"""
+        state = self.connections.pop(client_socket, None)
+        self.pending.pop(client_socket, None)
+        self.viewer_queues.pop(client_socket, None)
+        
+        # Remove from tracking
+        with self.lock:
+            self.presenters.pop(client_socket, None)
+            self.viewers.pop(client_socket, None)
+        
+        try:
+            self.selector.unregister(client_socket)
+        except (KeyError, ValueError):
+            pass
+        client_socket.close()
+        
+        if state is None:
+            return
+        
+        addr = state['addr']
+        if state['role'] == 'presenter':
+            self._log(f"🎬 Presenter disconnected: {addr[0]}:{addr[1]}")
+        elif state['role'] == 'viewer':
+            self._log(f"👁️  Viewer disconnected ({reason}): {addr[0]}:{addr[1]}")
+    
+    def _close_all(self):
+        """Close every connection and the listening socket"""
+        for client_socket in list(self.connections.keys()):
+            self._close_connection(client_socket)
+        
+        if self.send_pool:
+            self.send_pool.shutdown(wait=False)
+        for sock in (self._wakeup_recv, self.server_socket):
+            if sock:
+                try:
+                    self.selector.unregister(sock)
+                except (KeyError, ValueError):
+                    pass
+                sock.close()
+        if self._wakeup_send:
+            self._wakeup_send.close()
+        
+        self._flush_log()
+    
+    def _log(self, message):
+        """Queue a log message; printing happens off the reactor thread"""
+        self._log_q.append(message)
+        self._log_event.set()
+    
+    def _log_writer(self):
+        """Print queued log messages"""
+        while self.running:
+            self._log_event.wait(timeout=0.5)
+            self._log_event.clear()
+            self._flush_log()
+    
+    def _flush_log(self):
+        """Print everything currently queued with a single write"""
+        lines = []
+        while True:
+            try:
+                lines.append(self._log_q.popleft())
+            except IndexError:
+                break
+        
+        if lines:
+            lines.append("")
+            sys.stdout.write("\n".join(lines))
+            sys.stdout.flush()
     
     def _log_stats(self):
         """Log server statistics"""
@@ -236,32 +613,13 @@ class ScreenShareServer:
             viewers = len(self.viewers)
         
         mbytes = self.stats['bytes_relayed'] / (1024 * 1024)
-        print(f"📊 Screen: {self.stats['frames_relayed']} frames | "
-              f"{mbytes:.2f} MB | "
-              f"{presenters} presenters | {viewers} viewers")
+        self._log(f"📊 Screen: {self.stats['frames_relayed']} frames | "
+                  f"{mbytes:.2f} MB | "
+                  f"{presenters} presenters | {viewers} viewers")
     
     def stop(self):
-        """Stop the server"""
+        """Stop the server; the reactor closes all connections on exit"""
         self.running = False
-        
-        # Close all connections
-        with self.lock:
-            for socket in list(self.presenters.keys()):
-                try:
-                    socket.close()
-                except:
-                    pass
-            for socket in list(self.viewers.keys()):
-                try:
-                    socket.close()
-                except:
-                    pass
-            self.presenters.clear()
-            self.viewers.clear()
-        
-        if self.server_socket:
-            self.server_socket.close()
-        
         print("🛑 Screen share server stopped")
     
     def get_stats(self):
@@ -270,6 +628,7 @@ class ScreenShareServer:
             return {
                 'frames_relayed': self.stats['frames_relayed'],
                 'bytes_relayed': self.stats['bytes_relayed'],
+                'frames_dropped': self.stats['frames_dropped'],
                 'presenters': len(self.presenters),
                 'viewers': len(self.viewers),
                 'total_connections': self.stats['total_connections']
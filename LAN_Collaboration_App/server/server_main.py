@@ -17,6 +17,7 @@ from shared.constants import (
     VIDEO_PORT, AUDIO_PORT, CHAT_PORT,
     FILE_TRANSFER_PORT, SCREEN_SHARE_PORT
 )
+from shared.reactor import Reactor
 
 # Import server modules
 from video_server import VideoConferenceServer
@@ -27,12 +28,18 @@ from screen_share_server import ScreenShareServer
 
 
 class UnifiedServer:
-    """Unified server managing all collaboration services"""
+    """Unified server managing all collaboration services
+    
+    Video, audio and screen sharing share one selector reactor thread.
+    Chat runs its own asyncio loop and file transfer keeps a thread per
+    transfer for blocking disk I/O.
+    """
     
     def __init__(self):
         self.servers = {}
         self.running = False
         self.server_threads = []
+        self.reactor = None
         
         # Register signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -47,16 +54,38 @@ class UnifiedServer:
         
         self.running = True
         
-        # Start each service in a separate thread
-        services = [
+        # Socket-driven services share one reactor thread
+        reactor_services = [
             ('Video Conference', VideoConferenceServer, VIDEO_PORT),
             ('Audio Conference', AudioConferenceServer, AUDIO_PORT),
-            ('Chat', ChatServer, CHAT_PORT),
-            ('File Transfer', FileTransferServer, FILE_TRANSFER_PORT),
             ('Screen Share', ScreenShareServer, SCREEN_SHARE_PORT)
         ]
         
-        for name, server_class, port in services:
+        self.reactor = Reactor()
+        
+        for name, server_class, port in reactor_services:
+            try:
+                server = server_class(port)
+                self.reactor.add(server)
+                self.servers[name] = server
+                
+                print(f"✓ {name:20s} → Port {port:5d} [RUNNING]")
+                
+            except Exception as e:
+                print(f"✗ {name:20s} → Port {port:5d} [FAILED: {e}]")
+        
+        if self.reactor.services:
+            thread = threading.Thread(target=self._run_reactor, daemon=True)
+            thread.start()
+            self.server_threads.append(thread)
+        
+        # Start the remaining services in separate threads
+        threaded_services = [
+            ('Chat', ChatServer, CHAT_PORT),
+            ('File Transfer', FileTransferServer, FILE_TRANSFER_PORT)
+        ]
+        
+        for name, server_class, port in threaded_services:
             try:
                 server = server_class(port)
                 self.servers[name] = server
@@ -94,6 +123,13 @@ class UnifiedServer:
         finally:
             self.stop_all()
     
+    def _run_reactor(self):
+        """Run the shared reactor for video, audio and screen sharing"""
+        try:
+            self.reactor.run()
+        except Exception as e:
+            print(f"\n❌ Reactor error: {e}")
+    
     def _run_server(self, name, server):
         """Run a server instance"""
         try:
@@ -112,6 +148,9 @@ class UnifiedServer:
         
         self.running = False
         
+        if self.reactor:
+            self.reactor.stop()
+        
         for name, server in self.servers.items():
             try:
                 print(f"⏳ Stopping {name}...")
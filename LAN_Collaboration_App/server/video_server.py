@@ -5,6 +5,7 @@ Uses UDP for low-latency video transmission
 """
 
 import socket
+import selectors
 import threading
 import sys
 import os
@@ -13,143 +14,223 @@ import time
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from shared.constants import VIDEO_PORT, VIDEO_BUFFER_SIZE
+from shared.constants import (
+    VIDEO_PORT, VIDEO_BUFFER_SIZE, VIDEO_SOCKET_BUFFER_SIZE,
+    MAX_CONNECTIONS, UDP_RECV_BATCH, CLEANUP_INTERVAL
+)
 from shared.protocol import VIDEO
 from shared.helpers import unpack_message
+from shared.mmsg import DatagramReceiver, DatagramSender, HAVE_RECVMMSG, HAVE_SENDMMSG
+from shared.reactor import Reactor
 
 
 class VideoConferenceServer:
-    """Multi-user video conferencing server"""
+    """Multi-user video conferencing server
+    
+    Runs as a Reactor service: start() runs it on its own reactor, or
+    server_main registers it on a reactor shared with other services.
+    """
     
     def __init__(self, port=VIDEO_PORT):
         self.port = port
         self.sock = None
+        self.selector = None
         self.running = False
         
-        # Track connected clients: {(ip, port): last_seen_time}
+        # Last packet time per client: {(ip, port): last_seen_time}
+        # Written without a lock; single dict stores are atomic
         self.clients = {}
+        
+        # Connected clients, published as an immutable tuple. Readers just
+        # grab the reference; writers rebuild it under clients_lock, which
+        # only happens when a client joins or leaves.
+        self._client_addrs = ()
         self.clients_lock = threading.Lock()
         
-        # Statistics
-        self.stats = {
-            'total_packets': 0,
-            'total_bytes': 0,
-            'clients_served': set()
-        }
+        # Batched UDP I/O (Linux)
+        self.receiver = None
+        self.sender = None
+        
+        # Statistics, kept as plain attributes since they change per packet
+        self._total_packets = 0
+        self._total_bytes = 0
+        self._clients_served_ips = set()
+        
+        # Stale clients are swept from the reactor thread
+        self._next_cleanup = 0
     
     def start(self):
         """Start the video conference server"""
         try:
-            # Create UDP socket
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, VIDEO_BUFFER_SIZE)
-            self.sock.bind(('0.0.0.0', self.port))
-            self.sock.settimeout(1.0)
-            
-            self.running = True
-            
-            print(f"📹 Video Conference Server listening on UDP port {self.port}")
-            
-            # Start cleanup thread
-            cleanup_thread = threading.Thread(target=self._cleanup_stale_clients, daemon=True)
-            cleanup_thread.start()
-            
-            # Main loop
-            while self.running:
-                try:
-                    # Receive video packet
-                    data, sender_addr = self.sock.recvfrom(VIDEO_BUFFER_SIZE)
-                    
-                    # Update client tracking
-                    with self.clients_lock:
-                        self.clients[sender_addr] = time.time()
-                        self.stats['clients_served'].add(sender_addr[0])
-                    
-                    # Update stats
-                    self.stats['total_packets'] += 1
-                    self.stats['total_bytes'] += len(data)
-                    
-                    # Broadcast to all other clients
-                    self._broadcast_video(data, sender_addr)
-                    
-                    # Log stats periodically
-                    if self.stats['total_packets'] % 500 == 0:
-                        self._log_stats()
-                        
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if self.running:
-                        print(f"⚠️  Video error: {e}")
-                        
+            reactor = Reactor()
+            reactor.add(self)
+            reactor.run()
         except Exception as e:
             print(f"❌ Video server error: {e}")
         finally:
             self.stop()
     
+    def register(self, selector):
+        """Open the UDP socket and register it with a reactor selector"""
+        # Create UDP socket
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, VIDEO_SOCKET_BUFFER_SIZE)
+        self.sock.bind(('0.0.0.0', self.port))
+        
+        # The reactor thread is shared with other services: never block on this socket
+        self.sock.setblocking(False)
+        
+        # The kernel silently caps SO_RCVBUF at net.core.rmem_max
+        rcvbuf = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        if rcvbuf < VIDEO_SOCKET_BUFFER_SIZE:
+            print(f"⚠️  Video receive buffer limited to {rcvbuf} bytes; "
+                  f"raise it with: sysctl -w net.core.rmem_max=12582912")
+        
+        # Batch receives with recvmmsg where available
+        if HAVE_RECVMMSG:
+            self.receiver = DatagramReceiver(UDP_RECV_BATCH, VIDEO_BUFFER_SIZE)
+        if HAVE_SENDMMSG:
+            self.sender = DatagramSender(MAX_CONNECTIONS)
+        
+        self.selector = selector
+        selector.register(self.sock, selectors.EVENT_READ, data=self)
+        
+        self.running = True
+        
+        print(f"📹 Video Conference Server listening on UDP port {self.port}")
+        
+        self._next_cleanup = time.time() + CLEANUP_INTERVAL
+    
+    def handle(self, key, mask):
+        """Receive and relay the video packets waiting on the socket"""
+        try:
+            # Receive video packets
+            if self.receiver:
+                packets = self.receiver.recv(self.sock)
+            else:
+                packets = (self.sock.recvfrom(VIDEO_BUFFER_SIZE),)
+            
+            now = time.time()
+            handle_packet = self._handle_video_packet
+            for data, sender_addr in packets:
+                handle_packet(data, sender_addr, now)
+                
+        except (socket.timeout, BlockingIOError):
+            pass
+        except Exception as e:
+            if self.running:
+                print(f"⚠️  Video error: {e}")
+    
+    def after_select(self):
+        """Sweep stale clients once per cleanup interval"""
+        now = time.time()
+        if now >= self._next_cleanup:
+            self._next_cleanup = now + CLEANUP_INTERVAL
+            self._cleanup_stale_clients(now)
+    
+    def close(self):
+        """Detach from the reactor selector and close the socket; called on the reactor thread"""
+        if self.sock:
+            try:
+                self.selector.unregister(self.sock)
+            except (KeyError, ValueError):
+                pass
+            self.sock.close()
+    
+    def _handle_video_packet(self, data, sender_addr, now):
+        """Track the sender and relay one video packet"""
+        # Update client tracking; only a new client takes the lock
+        if sender_addr not in self._client_addrs:
+            self._add_client(sender_addr)
+        self.clients[sender_addr] = now
+        
+        # Update stats
+        self._total_packets += 1
+        self._total_bytes += len(data)
+        
+        # Broadcast to all other clients
+        self._broadcast_video(data, sender_addr)
+        
+        # Log stats periodically
+        if self._total_packets % 500 == 0:
+            self._log_stats()
+    
+    def _add_client(self, addr):
+        """Publish a new broadcast target"""
+        with self.clients_lock:
+            if addr not in self._client_addrs:
+                self.clients[addr] = time.time()
+                self._client_addrs = self._client_addrs + (addr,)
+                
+                # Every address passes through here first, so this sees each IP
+                self._clients_served_ips.add(addr[0])
+    
+    def _remove_clients(self, addrs):
+        """Drop clients from the broadcast targets"""
+        with self.clients_lock:
+            self._client_addrs = tuple(a for a in self._client_addrs if a not in addrs)
+            for addr in addrs:
+                self.clients.pop(addr, None)
+    
     def _broadcast_video(self, data, sender_addr):
         """Broadcast video packet to all clients except sender"""
-        with self.clients_lock:
+        client_addrs = self._client_addrs
+        
+        if self.sender:
+            disconnected = self.sender.send(self.sock, data, client_addrs, skip=sender_addr)
+        else:
             disconnected = []
-            
-            for client_addr in list(self.clients.keys()):
+            for client_addr in client_addrs:
                 if client_addr == sender_addr:
                     continue  # Don't echo back to sender
                 
                 try:
                     self.sock.sendto(data, client_addr)
+                except BlockingIOError:
+                    pass  # Send buffer full, drop this datagram
                 except Exception as e:
                     disconnected.append(client_addr)
-            
-            # Remove disconnected clients
-            for addr in disconnected:
-                if addr in self.clients:
-                    del self.clients[addr]
+        
+        # Remove disconnected clients
+        if disconnected:
+            self._remove_clients(disconnected)
     
-    def _cleanup_stale_clients(self):
+    def _cleanup_stale_clients(self, current_time):
         """Remove clients that haven't sent data recently"""
         TIMEOUT = 30  # 30 seconds
         
-        while self.running:
-            time.sleep(10)  # Check every 10 seconds
-            
-            current_time = time.time()
-            with self.clients_lock:
-                stale = [
-                    addr for addr, last_seen in self.clients.items()
-                    if current_time - last_seen > TIMEOUT
-                ]
-                
-                for addr in stale:
-                    del self.clients[addr]
-                    print(f"🔌 Video client {addr[0]}:{addr[1]} timed out")
+        stale = [
+            addr for addr in self._client_addrs
+            if current_time - self.clients.get(addr, current_time) > TIMEOUT
+        ]
+        
+        if stale:
+            self._remove_clients(stale)
+            for addr in stale:
+                print(f"🔌 Video client {addr[0]}:{addr[1]} timed out")
     
     def _log_stats(self):
         """Log server statistics"""
-        with self.clients_lock:
-            active = len(self.clients)
+        active = len(self._client_addrs)
         
-        mbytes = self.stats['total_bytes'] / (1024 * 1024)
-        print(f"📊 Video: {self.stats['total_packets']} packets | "
+        mbytes = self._total_bytes / (1024 * 1024)
+        print(f"📊 Video: {self._total_packets} packets | "
               f"{mbytes:.2f} MB | "
               f"{active} active clients")
     
     def stop(self):
-        """Stop the server"""
+        """Stop the server; the reactor closes the socket on exit"""
         self.running = False
-        if self.sock:
-            self.sock.close()
         print("🛑 Video server stopped")
     
     def get_stats(self):
         """Get server statistics"""
-        with self.clients_lock:
-            return {
-                'active_clients': len(self.clients),
-                'total_packets': self.stats['total_packets'],
-                'total_bytes': self.stats['total_bytes'],
-                'unique_clients': len(self.stats['clients_served'])
-            }
+        return {
+            'active_clients': len(self._client_addrs),
+            'total_packets': self._total_packets,
+            'total_bytes': self._total_bytes,
+            'unique_clients': len(self._clients_served_ips)
+        }
 
 
 if __name__ == '__main__':
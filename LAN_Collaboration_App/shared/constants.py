@@ -22,17 +22,25 @@ VIDEO_BUFFER_SIZE = 65536    # 64 KB for video frames
 AUDIO_BUFFER_SIZE = 8192     # 8 KB for audio chunks
 FILE_CHUNK_SIZE = 32768      # 32 KB for file transfers
 MAX_MESSAGE_SIZE = 1048576   # 1 MB maximum message size
+FILE_SOCKET_BUFFER_SIZE = 4194304  # 4 MB socket buffers for file transfers
+CHAT_SOCKET_BUFFER_SIZE = 262144   # 256 KB socket buffers for chat
+CHAT_QUEUE_LIMIT = 4194304         # 4 MB of output queued per chat client
+SCREEN_QUEUE_LIMIT = 8388608       # 8 MB of frames queued per screen share viewer
+SCREEN_SOCKET_BUFFER_SIZE = 4194304  # 4 MB socket buffers for screen share
+VIDEO_SOCKET_BUFFER_SIZE = 8388608   # 8 MB receive buffer for the video server
 
 # Timeouts (in seconds)
 CONNECTION_TIMEOUT = 30
 SOCKET_TIMEOUT = 10
 HEARTBEAT_INTERVAL = 5
 DISCOVERY_TIMEOUT = 3
+CLEANUP_INTERVAL = 10  # Sweep for clients that stopped sending
 
 # Network Settings
 MAX_CONNECTIONS = 10
 BROADCAST_ADDRESS = "255.255.255.255"
 MULTICAST_GROUP = "224.0.0.1"
+UDP_RECV_BATCH = 32     # Datagrams fetched per recvmmsg call (Linux)
 
 # Video Settings
 VIDEO_WIDTH = 640
@@ -6,6 +6,14 @@ Uses struct for efficient binary packing/unpacking
 import struct
 from shared.constants import HEADER_SIZE, PROTOCOL_VERSION, MAX_MESSAGE_SIZE
 
+# Formats compiled once instead of being re-parsed on every call
+# Header: !BBIIH = network byte order, unsigned char, unsigned char,
+# unsigned int, unsigned int, unsigned short
+_HEADER = struct.Struct('!BBIIH')
+_U32 = struct.Struct('!I')
+_FILESIZE_AND_LENGTH = struct.Struct('!QI')    # Adjacent in file metadata
+_HEADER_PACK = _HEADER.pack
+
 def pack_message(msg_type, payload=b""):
     """
     Pack a message with header and payload for network transmission
@@ -17,9 +25,12 @@ def pack_message(msg_type, payload=b""):
     - Sequence Number (4 bytes): Message sequence number
     - Reserved (2 bytes): Reserved for future use
     
+    The payload must already be bytes-like; encode text first, or use
+    pack_message_any() when the type is not known.
+    
     Args:
         msg_type (int): Message type constant from protocol.py
-        payload (bytes): Message payload data
+        payload (bytes, bytearray or memoryview): Message payload data
         
     Returns:
         bytes: Packed message (header + payload)
@@ -27,30 +38,97 @@ def pack_message(msg_type, payload=b""):
     Raises:
         ValueError: If payload exceeds maximum message size
     """
-    if not isinstance(payload, bytes):
-        payload = str(payload).encode('utf-8')
+    # Checked in development only; python -O drops it from the hot path
+    assert isinstance(payload, (bytes, bytearray, memoryview)), \
+        f"payload must be bytes-like, not {type(payload).__name__}"
     
     payload_length = len(payload)
     
     if payload_length > MAX_MESSAGE_SIZE:
         raise ValueError(f"Payload size {payload_length} exceeds maximum {MAX_MESSAGE_SIZE}")
     
-    # Static sequence number (can be enhanced with actual sequence tracking)
-    sequence_number = 0
-    reserved = 0
+    return _HEADER_PACK(PROTOCOL_VERSION, msg_type, payload_length, 0, 0) + payload
+
+
+def pack_message_any(msg_type, payload=b""):
+    """
+    Pack a message whose payload may not be bytes yet
+    
+    Anything that is not bytes-like is converted with str() and encoded as
+    UTF-8, then packed with pack_message().
+    
+    Args:
+        msg_type (int): Message type constant from protocol.py
+        payload: Message payload data of any type
+        
+    Returns:
+        bytes: Packed message (header + payload)
+        
+    Raises:
+        ValueError: If payload exceeds maximum message size
+    """
+    if not isinstance(payload, (bytes, bytearray, memoryview)):
+        payload = str(payload).encode('utf-8')
+    
+    return pack_message(msg_type, payload)
+
+
+def pack_header(msg_type, payload_length):
+    """
+    Pack only the 12-byte message header
+    
+    Used when the payload is streamed separately (e.g. with sendfile), so
+    the payload length is not limited by MAX_MESSAGE_SIZE.
+    
+    Args:
+        msg_type (int): Message type constant from protocol.py
+        payload_length (int): Length of the payload that follows
+        
+    Returns:
+        bytes: Packed header
+    """
+    # Version, type, length, then a static sequence number (can be enhanced
+    # with actual sequence tracking) and the reserved field
+    return _HEADER_PACK(PROTOCOL_VERSION, msg_type, payload_length, 0, 0)
+
+
+def pack_header_into(buffer, msg_type, payload_length, offset=0):
+    """
+    Pack the 12-byte message header into an existing buffer
+    
+    Lets a sender read the payload into the same buffer right behind the
+    header and send both without building a new packet.
+    
+    Args:
+        buffer (bytearray or memoryview): Writable buffer
+        msg_type (int): Message type constant from protocol.py
+        payload_length (int): Length of the payload that follows
+        offset (int): Position of the header in buffer
+    """
+    _HEADER.pack_into(buffer, offset, PROTOCOL_VERSION, msg_type, payload_length, 0, 0)
+
+
+def unpack_header(data, offset=0):
+    """
+    Unpack only the 12-byte message header
     
-    # Pack header: !BBIHH = network byte order, unsigned char, unsigned char, 
-    # unsigned int, unsigned short, unsigned short
-    header = struct.pack(
-        '!BBIHH',
-        PROTOCOL_VERSION,    # 1 byte
-        msg_type,            # 1 byte
-        payload_length,      # 4 bytes
-        sequence_number,     # 4 bytes
-        reserved             # 2 bytes
-    )
+    Lets stream readers learn the size of the next message before its
+    payload has arrived. Nothing is validated.
     
-    return header + payload
+    Args:
+        data (bytes, bytearray or memoryview): Buffer holding the header
+        offset (int): Position of the header in data
+        
+    Returns:
+        tuple: (version, msg_type, payload_length, sequence_number)
+        
+    Raises:
+        ValueError: If data holds fewer than HEADER_SIZE bytes at offset
+    """
+    if len(data) - offset < HEADER_SIZE:
+        raise ValueError(f"Data too short: {len(data) - offset} bytes (minimum {HEADER_SIZE})")
+    
+    return _HEADER.unpack_from(data, offset)[:4]
 
 
 def unpack_message(data):
@@ -71,34 +149,26 @@ def unpack_message(data):
     Raises:
         ValueError: If data is too short or corrupted
     """
-    if len(data) < HEADER_SIZE:
-        raise ValueError(f"Data too short: {len(data)} bytes (minimum {HEADER_SIZE})")
+    received = len(data) - HEADER_SIZE
     
-    # Unpack header
-    header = data[:HEADER_SIZE]
-    payload = data[HEADER_SIZE:]
-    
-    try:
-        version, msg_type, payload_length, sequence_number, reserved = struct.unpack(
-            '!BBIHH',
-            header
-        )
-    except struct.error as e:
-        raise ValueError(f"Failed to unpack header: {e}")
+    if received < 0:
+        raise ValueError(f"Data too short: {len(data)} bytes (minimum {HEADER_SIZE})")
     
-    # Validate payload length
-    if len(payload) != payload_length:
-        raise ValueError(
-            f"Payload length mismatch: expected {payload_length}, got {len(payload)}"
-        )
+    # Unpack header; cannot fail once the length is checked
+    version, msg_type, payload_length, sequence_number, reserved = _HEADER.unpack_from(data)
     
-    # Validate protocol version
-    if version != PROTOCOL_VERSION:
+    # One test on the success path; which check failed is only worked out
+    # when raising
+    if received != payload_length or version != PROTOCOL_VERSION:
+        if received != payload_length:
+            raise ValueError(
+                f"Payload length mismatch: expected {payload_length}, got {received}"
+            )
         raise ValueError(
             f"Protocol version mismatch: expected {PROTOCOL_VERSION}, got {version}"
         )
     
-    return version, msg_type, payload_length, sequence_number, payload
+    return version, msg_type, payload_length, sequence_number, data[HEADER_SIZE:]
 
 
 def pack_string(text):
@@ -113,7 +183,7 @@ def pack_string(text):
     """
     encoded = text.encode('utf-8')
     length = len(encoded)
-    return struct.pack('!I', length) + encoded
+    return _U32.pack(length) + encoded
 
 
 def unpack_string(data, offset=0):
@@ -127,9 +197,10 @@ def unpack_string(data, offset=0):
     Returns:
         tuple: (string, new_offset)
     """
-    length = struct.unpack('!I', data[offset:offset+4])[0]
-    offset += 4
-    text = data[offset:offset+length].decode('utf-8')
+    length = _U32.unpack_from(data, offset)[0]
+    offset += _U32.size
+    # Decode from a view so the string bytes are not sliced out first
+    text = str(memoryview(data)[offset:offset+length], 'utf-8')
     offset += length
     return text, offset
 
@@ -150,13 +221,12 @@ def pack_file_metadata(filename, filesize, checksum=""):
     checksum_bytes = checksum.encode('utf-8')
     
     # Format: filename_length(4) + filename + filesize(8) + checksum_length(4) + checksum
-    metadata = struct.pack('!I', len(filename_bytes))
-    metadata += filename_bytes
-    metadata += struct.pack('!Q', filesize)
-    metadata += struct.pack('!I', len(checksum_bytes))
-    metadata += checksum_bytes
-    
-    return metadata
+    return b''.join((
+        _U32.pack(len(filename_bytes)),
+        filename_bytes,
+        _FILESIZE_AND_LENGTH.pack(filesize, len(checksum_bytes)),
+        checksum_bytes
+    ))
 
 
 def unpack_file_metadata(data):
@@ -169,22 +239,22 @@ def unpack_file_metadata(data):
     Returns:
         dict: File metadata with keys: filename, filesize, checksum
     """
+    # Strings are decoded from views so their bytes are not sliced out first
+    view = memoryview(data)
     offset = 0
     
     # Unpack filename
-    filename_length = struct.unpack('!I', data[offset:offset+4])[0]
-    offset += 4
-    filename = data[offset:offset+filename_length].decode('utf-8')
+    filename_length = _U32.unpack_from(view, offset)[0]
+    offset += _U32.size
+    filename = str(view[offset:offset+filename_length], 'utf-8')
     offset += filename_length
     
-    # Unpack filesize
-    filesize = struct.unpack('!Q', data[offset:offset+8])[0]
-    offset += 8
+    # Unpack filesize and checksum length in one go
+    filesize, checksum_length = _FILESIZE_AND_LENGTH.unpack_from(view, offset)
+    offset += _FILESIZE_AND_LENGTH.size
     
     # Unpack checksum
-    checksum_length = struct.unpack('!I', data[offset:offset+4])[0]
-    offset += 4
-    checksum = data[offset:offset+checksum_length].decode('utf-8')
+    checksum = str(view[offset:offset+checksum_length], 'utf-8')
     
     return {
         'filename': filename,
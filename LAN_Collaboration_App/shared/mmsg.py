@@ -0,0 +1,361 @@
+"""
+Batched UDP socket I/O for LAN Collaboration App
+Calls Linux recvmmsg/sendmmsg through ctypes so one system call moves many datagrams
+"""
+
+import ctypes
+import errno
+import os
+import select
+import socket
+import sys
+
+# Resolve libc symbols once; anything other than Linux uses plain recvfrom/sendto
+_libc = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        _libc = None
+
+HAVE_RECVMMSG = _libc is not None and hasattr(_libc, 'recvmmsg')
+HAVE_SENDMMSG = _libc is not None and hasattr(_libc, 'sendmmsg')
+
+MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0x40)
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t)
+    ]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ('sin_family', ctypes.c_ushort),
+        ('sin_port', ctypes.c_ubyte * 2),    # Network byte order
+        ('sin_addr', ctypes.c_ubyte * 4),
+        ('sin_zero', ctypes.c_ubyte * 8)
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.POINTER(_IOVec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int)
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_hdr', _MsgHdr),
+        ('msg_len', ctypes.c_uint)
+    ]
+
+
+if HAVE_RECVMMSG:
+    _libc.recvmmsg.argtypes = [
+        ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint,
+        ctypes.c_int, ctypes.c_void_p
+    ]
+    _libc.recvmmsg.restype = ctypes.c_int
+
+if HAVE_SENDMMSG:
+    _libc.sendmmsg.argtypes = [
+        ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int
+    ]
+    _libc.sendmmsg.restype = ctypes.c_int
+
+
+def _raise_errno():
+    err = ctypes.get_errno()
+    raise OSError(err, os.strerror(err))
+
+
+def _set_address(addr, ip, port):
+    """Write an (ip, port) destination into a sockaddr_in"""
+    ctypes.memmove(addr.sin_addr, socket.inet_aton(ip), 4)
+    addr.sin_port[0] = port >> 8
+    addr.sin_port[1] = port & 0xFF
+
+
+def _send_span(sock, msgs, msg_size, start, end):
+    """Send messages start to end of an mmsghdr array with sendmmsg
+    
+    A blocking socket waits for send buffer space like sendto would. A
+    non-blocking socket drops the rest of the span instead, so reactor
+    handlers never wait here.
+    
+    Args:
+        sock (socket.socket): UDP socket
+        msgs (ctypes.Array): Prepared mmsghdr array
+        msg_size (int): Size of one mmsghdr
+        start (int): Index of the first message to send
+        end (int): Index one past the last message to send
+    
+    Returns:
+        list: Indices of the messages the kernel rejected
+    """
+    fd = sock.fileno()
+    base = ctypes.addressof(msgs)
+    failed = []
+    
+    while start < end:
+        count = _libc.sendmmsg(fd, base + start * msg_size, end - start, 0)
+        
+        if count > 0:
+            start += count
+            continue
+        
+        if count == 0:
+            # Nothing was sent; count the message as rejected so the loop advances
+            failed.append(start)
+            start += 1
+            continue
+        
+        err = ctypes.get_errno()
+        if err in (errno.EAGAIN, errno.EWOULDBLOCK):
+            timeout = sock.gettimeout()
+            if timeout == 0.0:
+                break  # Send buffer full; drop the remaining datagrams
+            
+            # Send buffer full, wait like a blocking sendto would
+            _, writable, _ = select.select([], [fd], [], timeout)
+            if not writable:
+                raise socket.timeout("timed out")
+            continue
+        
+        # The first remaining message was rejected; skip it
+        failed.append(start)
+        start += 1
+    
+    return failed
+
+
+class DatagramReceiver:
+    """Receives up to batch_size datagrams per recvmmsg call
+    
+    Works on IPv4 UDP sockets. Honors the socket timeout: raises
+    socket.timeout when nothing arrives in time, like recvfrom.
+    """
+    
+    def __init__(self, batch_size, buffer_size):
+        if not HAVE_RECVMMSG:
+            raise OSError(errno.ENOSYS, "recvmmsg is not available")
+        
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        
+        # One contiguous buffer, sliced into batch_size slots
+        self._buffer = bytearray(batch_size * buffer_size)
+        self._view = memoryview(self._buffer)
+        self._c_buffer = (ctypes.c_char * len(self._buffer)).from_buffer(self._buffer)
+        base = ctypes.addressof(self._c_buffer)
+        
+        self._iovecs = (_IOVec * batch_size)()
+        self._addrs = (_SockAddrIn * batch_size)()
+        self._msgs = (_MMsgHdr * batch_size)()
+        self._addr_len = ctypes.sizeof(_SockAddrIn)
+        
+        for i in range(batch_size):
+            self._iovecs[i].iov_base = base + i * buffer_size
+            self._iovecs[i].iov_len = buffer_size
+            
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._addrs[i])
+            hdr.msg_namelen = self._addr_len
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+        
+        self._used = 0
+    
+    def recv(self, sock):
+        """Receive a batch of datagrams
+        
+        Args:
+            sock (socket.socket): Bound UDP socket
+        
+        Returns:
+            list: (data, (ip, port)) tuples, at least one
+        
+        Raises:
+            socket.timeout: If no datagram arrived within the socket timeout
+        """
+        fd = sock.fileno()
+        
+        # The kernel overwrote the address lengths of the last batch
+        for i in range(self._used):
+            self._msgs[i].msg_hdr.msg_namelen = self._addr_len
+        
+        count = _libc.recvmmsg(fd, self._msgs, self.batch_size, MSG_DONTWAIT, None)
+        
+        if count < 0:
+            if ctypes.get_errno() not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                _raise_errno()
+            
+            # Nothing queued, wait for readability like a blocking recvfrom
+            readable, _, _ = select.select([fd], [], [], sock.gettimeout())
+            if not readable:
+                raise socket.timeout("timed out")
+            
+            count = _libc.recvmmsg(fd, self._msgs, self.batch_size, MSG_DONTWAIT, None)
+            if count < 0:
+                if ctypes.get_errno() in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise socket.timeout("timed out")
+                _raise_errno()
+        
+        self._used = count
+        
+        packets = []
+        for i in range(count):
+            start = i * self.buffer_size
+            data = bytes(self._view[start:start + self._msgs[i].msg_len])
+            
+            addr = self._addrs[i]
+            port = (addr.sin_port[0] << 8) | addr.sin_port[1]
+            packets.append((data, (socket.inet_ntoa(bytes(addr.sin_addr)), port)))
+        
+        return packets
+
+
+class DatagramSender:
+    """Sends one datagram to many destinations per sendmmsg call
+    
+    Works on IPv4 UDP sockets. Destination addresses are only reloaded
+    when a different destinations tuple is passed in, so callers should
+    keep reusing the same tuple until their client set changes.
+    """
+    
+    def __init__(self, max_destinations):
+        if not HAVE_SENDMMSG:
+            raise OSError(errno.ENOSYS, "sendmmsg is not available")
+        
+        # Every message carries the same payload through one shared iovec
+        self._iovec = _IOVec()
+        self._addr_len = ctypes.sizeof(_SockAddrIn)
+        self._msg_size = ctypes.sizeof(_MMsgHdr)
+        self._allocate(max_destinations)
+    
+    def _allocate(self, capacity):
+        """(Re)build the message array for up to capacity destinations"""
+        self.capacity = capacity
+        self._addrs = (_SockAddrIn * capacity)()
+        self._msgs = (_MMsgHdr * capacity)()
+        
+        for i in range(capacity):
+            self._addrs[i].sin_family = socket.AF_INET
+            
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._addrs[i])
+            hdr.msg_namelen = self._addr_len
+            hdr.msg_iov = ctypes.pointer(self._iovec)
+            hdr.msg_iovlen = 1
+        
+        self._destinations = None
+        self._index = {}
+    
+    def _load(self, destinations):
+        """Write destination addresses into the message array"""
+        if len(destinations) > self.capacity:
+            self._allocate(len(destinations))
+        
+        for i, (ip, port) in enumerate(destinations):
+            _set_address(self._addrs[i], ip, port)
+        
+        self._destinations = destinations
+        self._index = {dest: i for i, dest in enumerate(destinations)}
+    
+    def send(self, sock, data, destinations, skip=None):
+        """Send data to every destination except skip
+        
+        Args:
+            sock (socket.socket): UDP socket
+            data (bytes): Datagram payload
+            destinations (tuple): (ip, port) tuples
+            skip (tuple): Destination to leave out, e.g. the sender
+        
+        Returns:
+            list: Destinations the datagram could not be sent to
+        """
+        if destinations is not self._destinations:
+            self._load(destinations)
+        
+        payload = ctypes.c_char_p(data)
+        self._iovec.iov_base = ctypes.cast(payload, ctypes.c_void_p)
+        self._iovec.iov_len = len(data)
+        
+        # Skipping one destination splits the array into two runs
+        total = len(destinations)
+        index = self._index.get(skip)
+        if index is None:
+            spans = [(0, total)]
+        else:
+            spans = [(0, index), (index + 1, total)]
+        
+        failed = []
+        for start, end in spans:
+            for i in _send_span(sock, self._msgs, self._msg_size, start, end):
+                failed.append(destinations[i])
+        
+        return failed
+
+
+class DatagramBatchSender:
+    """Sends a different datagram to each destination per sendmmsg call
+    
+    Works on IPv4 UDP sockets. Suits fan-outs where every destination gets
+    its own payload, like the audio mixer's per-client mixes.
+    """
+    
+    def __init__(self, max_messages):
+        if not HAVE_SENDMMSG:
+            raise OSError(errno.ENOSYS, "sendmmsg is not available")
+        
+        self._addr_len = ctypes.sizeof(_SockAddrIn)
+        self._msg_size = ctypes.sizeof(_MMsgHdr)
+        self._allocate(max_messages)
+    
+    def _allocate(self, capacity):
+        """(Re)build the message array for up to capacity messages"""
+        self.capacity = capacity
+        self._iovecs = (_IOVec * capacity)()
+        self._addrs = (_SockAddrIn * capacity)()
+        self._msgs = (_MMsgHdr * capacity)()
+        
+        for i in range(capacity):
+            self._addrs[i].sin_family = socket.AF_INET
+            
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._addrs[i])
+            hdr.msg_namelen = self._addr_len
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+    
+    def send(self, sock, packets):
+        """Send every packet to its destination
+        
+        Args:
+            sock (socket.socket): UDP socket
+            packets (list): (data, (ip, port)) tuples; data must be bytes
+        
+        Returns:
+            list: Destinations whose datagram could not be sent
+        """
+        if len(packets) > self.capacity:
+            self._allocate(len(packets))
+        
+        # The iovecs point into the bytes objects held by packets
+        for i, (data, (ip, port)) in enumerate(packets):
+            iovec = self._iovecs[i]
+            iovec.iov_base = ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p)
+            iovec.iov_len = len(data)
+            _set_address(self._addrs[i], ip, port)
+        
+        failed = _send_span(sock, self._msgs, self._msg_size, 0, len(packets))
+        return [packets[i][1] for i in failed]
\ No newline at end of file
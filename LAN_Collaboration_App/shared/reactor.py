@@ -0,0 +1,61 @@
+"""
+Selector reactor for LAN Collaboration App
+Runs one or more socket services on a single thread
+"""
+
+import selectors
+
+
+class Reactor:
+    """Single-threaded event loop shared by socket services
+    
+    A service registers its sockets with data=service and provides:
+        register(selector)  - open sockets and register them, set running
+        handle(key, mask)   - process one ready socket
+        after_select()      - per-pass work (queued flushes, timeouts)
+        close()             - release sockets, called on the reactor thread
+    
+    The loop runs until stop() is called or no service is running.
+    """
+    
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.services = []
+        self.running = False
+    
+    def add(self, service):
+        """Register a service's sockets with this reactor"""
+        service.register(self.selector)
+        self.services.append(service)
+    
+    def run(self, timeout=0.5):
+        """Dispatch socket events until stopped"""
+        self.running = True
+        
+        try:
+            while self.running and any(service.running for service in self.services):
+                for key, mask in self.selector.select(timeout=timeout):
+                    try:
+                        key.data.handle(key, mask)
+                    except Exception as e:
+                        if key.data.running:
+                            print(f"⚠️  Reactor handler error: {e}")
+                
+                for service in self.services:
+                    if service.running:
+                        try:
+                            service.after_select()
+                        except Exception as e:
+                            print(f"⚠️  Reactor error: {e}")
+        finally:
+            self.running = False
+            for service in self.services:
+                try:
+                    service.close()
+                except Exception as e:
+                    print(f"⚠️  Error closing service: {e}")
+            self.selector.close()
+    
+    def stop(self):
+        """Ask the loop to exit after the current pass"""
+        self.running = False
\ No newline at end of file
@@ -3,41 +3,76 @@ Simple Chat Server for testing client_chat.py
 Broadcasts messages to all connected clients
 """
 
+import errno
+import selectors
 import socket
-import threading
+import struct
 import sys
 import os
+from collections import deque
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(__file__))
 
-from shared.constants import CHAT_PORT, BUFFER_SIZE
+from shared.constants import (
+    CHAT_PORT, BUFFER_SIZE, HEADER_SIZE, MAX_MESSAGE_SIZE,
+    CHAT_SOCKET_BUFFER_SIZE, CHAT_QUEUE_LIMIT, PROTOCOL_VERSION
+)
 from shared.protocol import CHAT, DISCONNECT
-from shared.helpers import pack_message, unpack_message
+from shared.helpers import pack_header, unpack_header
+from shared.reactor import Reactor
+
+# Parsed bytes are only cut from the front of a receive buffer once this
+# many have piled up, so a burst of messages is not shifted once per message
+BUFFER_COMPACT_SIZE = 4096
+
+# Payloads this large are sent with MSG_ZEROCOPY (Linux): the kernel reads
+# them in place instead of copying, which only pays off for big sends
+ZEROCOPY_THRESHOLD = 16384
+HAVE_ZEROCOPY = sys.platform.startswith('linux')
+SO_ZEROCOPY = getattr(socket, 'SO_ZEROCOPY', 60)
+MSG_ZEROCOPY = getattr(socket, 'MSG_ZEROCOPY', 0x4000000)
+SO_EE_ORIGIN_ZEROCOPY = 5
+
+# struct sock_extended_err: errno, origin, type, code, pad, info, data
+_EXTENDED_ERR = struct.Struct('=IBBBBII')
 
 
 class SimpleChatServer:
-    """Simple chat server that broadcasts messages to all clients"""
+    """Simple chat server that broadcasts messages to all clients
+    
+    Runs as a Reactor service: one thread reads every client, and
+    broadcasts are queued per client and written when the socket is ready.
+    """
     
     def __init__(self, port=CHAT_PORT):
         self.port = port
-        self.clients = []  # List of connected client sockets
-        self.clients_lock = threading.Lock()
+        # Connected clients: {client_socket: {'addr': address, 'buffer': bytearray,
+        #                                     'offset': int, 'need': int,
+        #                                     'queue': deque, 'head_sent': int,
+        #                                     'zerocopy': bool, 'zc_next': int,
+        #                                     'zc_inflight': deque}}
+        # 'queue' holds output segments in order: bytearrays of coalesced small
+        # messages, and large payloads as immutable bytes sent with MSG_ZEROCOPY.
+        # Those stay in 'zc_inflight' as (send id, payload) until the kernel
+        # reports it is done reading them.
+        # A dict gives O(1) membership and removal by socket
+        self.clients = {}
         self.running = False
         self.server_socket = None
+        self.selector = None
+        
+        # Clients with queued output, flushed once per reactor pass
+        self._dirty = set()
         
+        # Log lines from this reactor pass, written together in after_select
+        self._log_lines = []
+    
     def start(self):
         """Start the chat server"""
         try:
-            # Create TCP socket
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            
-            # Bind to all interfaces
-            self.server_socket.bind(('0.0.0.0', self.port))
-            self.server_socket.listen(5)
-            
-            self.running = True
+            reactor = Reactor()
+            reactor.add(self)
             
             print(f"\n🚀 Chat Server Started")
             print(f"📡 Listening on port {self.port}")
@@ -46,134 +81,363 @@ class SimpleChatServer:
             print("\nPress Ctrl+C to stop\n")
             print("=" * 60)
             
-            # Accept connections
-            while self.running:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    
-                    print(f"\n✓ New connection from {address[0]}:{address[1]}")
-                    
-                    # Add to clients list
-                    with self.clients_lock:
-                        self.clients.append(client_socket)
-                    
-                    # Start handler thread
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client_socket, address),
-                        daemon=True
-                    )
-                    client_thread.start()
-                    
-                except KeyboardInterrupt:
-                    break
-                except Exception as e:
-                    if self.running:
-                        print(f"Error accepting connection: {e}")
-                        
+            reactor.run()
+        
         except Exception as e:
             print(f"❌ Error starting server: {e}")
         finally:
             self.stop()
     
-    def stop(self):
-        """Stop the chat server"""
-        print("\n\n🛑 Shutting down chat server...")
-        self.running = False
+    def register(self, selector):
+        """Open the listening socket and register it with a reactor selector"""
+        # Create TCP socket
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         
-        # Close all client connections
-        with self.clients_lock:
-            for client in self.clients:
-                try:
-                    client.close()
-                except:
-                    pass
-            self.clients.clear()
+        # Bind to all interfaces
+        self.server_socket.bind(('0.0.0.0', self.port))
+        
+        # Deep backlog: a reconnect burst queues in the kernel instead of
+        # waiting out SYN retries; the accept loop drains it in one pass
+        self.server_socket.listen(socket.SOMAXCONN)
+        self.server_socket.setblocking(False)
+        
+        self.selector = selector
+        selector.register(self.server_socket, selectors.EVENT_READ, data=self)
+        
+        self.running = True
+    
+    def handle(self, key, mask):
+        """Dispatch one ready socket"""
+        sock = key.fileobj
+        
+        if sock is self.server_socket:
+            self._accept_clients()
+            return
+        
+        if mask & selectors.EVENT_READ:
+            self._handle_client(sock)
+        
+        if mask & selectors.EVENT_WRITE:
+            self._dirty.add(sock)
+    
+    def after_select(self):
+        """Write everything queued during this pass, one send() per client"""
+        if self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            for client_socket in dirty:
+                self._flush_client(client_socket)
+        
+        if self._log_lines:
+            self._flush_log()
+    
+    def close(self):
+        """Close every connection; called on the reactor thread"""
+        for client_socket in list(self.clients):
+            self._close_client(client_socket)
         
         # Close server socket
         if self.server_socket:
+            try:
+                self.selector.unregister(self.server_socket)
+            except (KeyError, ValueError):
+                pass
             self.server_socket.close()
         
+        self._flush_log()
+    
+    def _log(self, message):
+        """Queue a log line; a busy pass would otherwise write once per message"""
+        self._log_lines.append(message)
+    
+    def _flush_log(self):
+        """Write the queued log lines with a single write"""
+        lines, self._log_lines = self._log_lines, []
+        if lines:
+            lines.append("")
+            sys.stdout.write("\n".join(lines))
+            sys.stdout.flush()
+    
+    def stop(self):
+        """Stop the chat server"""
+        print("\n\n🛑 Shutting down chat server...")
+        
+        # The reactor closes all connections once it sees this
+        self.running = False
+        
         print("✓ Server stopped")
     
-    def _handle_client(self, client_socket, address):
-        """Handle a single client connection"""
-        buffer = b""
+    def _accept_clients(self):
+        """Accept every pending connection"""
+        while True:
+            try:
+                client_socket, address = self.server_socket.accept()
+            except BlockingIOError:
+                return
+            except OSError as e:
+                if self.running:
+                    self._log(f"Error accepting connection: {e}")
+                return
+            
+            self._log(f"\n✓ New connection from {address[0]}:{address[1]}")
+            
+            client_socket.setblocking(False)
+            
+            # Send small chat messages immediately, and give bursts room
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, CHAT_SOCKET_BUFFER_SIZE)
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CHAT_SOCKET_BUFFER_SIZE)
+            
+            zerocopy = False
+            if HAVE_ZEROCOPY:
+                try:
+                    client_socket.setsockopt(socket.SOL_SOCKET, SO_ZEROCOPY, 1)
+                    zerocopy = True
+                except OSError:
+                    pass  # Kernel without MSG_ZEROCOPY support
+            
+            self.clients[client_socket] = {
+                'addr': address,
+                'buffer': bytearray(),
+                'offset': 0,    # Start of the first unparsed message in buffer
+                'need': HEADER_SIZE,    # Bytes from offset before parsing can continue
+                'queue': deque(),
+                'queued': 0,        # Bytes in queue not yet sent
+                'head_sent': 0,     # Bytes of queue[0] already sent, for bytes segments
+                'zerocopy': zerocopy,
+                'zc_next': 0,       # Id the kernel gives the next MSG_ZEROCOPY send
+                'zc_inflight': deque()
+            }
+            self.selector.register(client_socket, selectors.EVENT_READ, data=self)
+    
+    def _handle_client(self, client_socket):
+        """Read from a client and process every complete message"""
+        info = self.clients.get(client_socket)
+        if info is None:
+            return
+        
+        address = info['addr']
+        
+        # Completions arrive on the error queue, which also wakes us as readable
+        if info['zc_next']:
+            self._reap_zerocopy(client_socket, info)
         
         try:
-            while self.running:
-                # Receive data
-                data = client_socket.recv(BUFFER_SIZE)
-                
-                if not data:
-                    break
-                
-                buffer += data
+            # Receive data
+            data = client_socket.recv(BUFFER_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._log(f"⚠️  Client {address[0]}:{address[1]} error: {e}")
+            data = b""
+        
+        if not data:
+            self._close_client(client_socket)
+            return
+        
+        buffer = info['buffer']
+        buffer += data
+        offset = info['offset']
+        
+        # A partial message's header was already parsed; wait until it is whole
+        if len(buffer) - offset < info['need']:
+            return
+        
+        need = HEADER_SIZE
+        
+        # Try to extract complete messages
+        while len(buffer) - offset >= HEADER_SIZE:
+            version, msg_type, payload_length, seq_num = unpack_header(buffer, offset)
+            
+            # Bound the receive buffer: refuse lengths no sender may use
+            if version != PROTOCOL_VERSION or payload_length > MAX_MESSAGE_SIZE:
+                self._log(f"⚠️  Invalid message header from {address[0]}:{address[1]}")
+                self._close_client(client_socket)
+                return
+            
+            message_size = HEADER_SIZE + payload_length
+            if len(buffer) - offset < message_size:
+                need = message_size
+                break  # Wait for the rest of the message
+            
+            payload = memoryview(buffer)[offset + HEADER_SIZE:offset + message_size]
+            
+            try:
+                # Process message
+                if msg_type == CHAT:
+                    message_text = str(payload, 'utf-8')
+                    self._log(f"📨 {message_text}")
+                    
+                    # Broadcast to all clients
+                    self._broadcast_message(message_text, sender=client_socket)
                 
-                # Try to extract complete messages
-                while len(buffer) >= 12:
-                    try:
-                        version, msg_type, payload_length, seq_num, payload = unpack_message(buffer)
-                        message_size = 12 + payload_length
-                        
-                        if len(buffer) < message_size:
-                            break
-                        
-                        # Process message
-                        if msg_type == CHAT:
-                            message_text = payload.decode('utf-8')
-                            print(f"📨 {message_text}")
-                            
-                            # Broadcast to all clients
-                            self._broadcast_message(message_text, sender=client_socket)
-                        
-                        elif msg_type == DISCONNECT:
-                            print(f"👋 Client {address[0]}:{address[1]} disconnecting")
-                            break
-                        
-                        # Remove processed message
-                        buffer = buffer[message_size:]
-                        
-                    except ValueError:
-                        break
-                    except Exception as e:
-                        print(f"⚠️  Error processing message: {e}")
-                        buffer = buffer[1:]
-                        
-        except Exception as e:
-            print(f"⚠️  Client {address[0]}:{address[1]} error: {e}")
-        finally:
-            # Remove client from list
-            with self.clients_lock:
-                if client_socket in self.clients:
-                    self.clients.remove(client_socket)
+                elif msg_type == DISCONNECT:
+                    self._log(f"👋 Client {address[0]}:{address[1]} disconnecting")
+                    self._close_client(client_socket)
+                    return
             
-            client_socket.close()
-            print(f"✗ Client {address[0]}:{address[1]} disconnected ({len(self.clients)} remaining)")
+            except Exception as e:
+                self._log(f"⚠️  Error processing message: {e}")
+            finally:
+                # The payload view pins the buffer; release it before resizing
+                payload.release()
+            
+            offset += message_size
+        
+        # Drop parsed messages; free when everything was consumed
+        if offset == len(buffer) or offset > BUFFER_COMPACT_SIZE:
+            del buffer[:offset]
+            offset = 0
+        info['offset'] = offset
+        info['need'] = need
+    
+    def _close_client(self, client_socket):
+        """Forget a client and close its socket"""
+        info = self.clients.pop(client_socket, None)
+        self._dirty.discard(client_socket)
+        
+        try:
+            self.selector.unregister(client_socket)
+        except (KeyError, ValueError):
+            pass
+        client_socket.close()
+        
+        if info:
+            address = info['addr']
+            self._log(f"✗ Client {address[0]}:{address[1]} disconnected ({len(self.clients)} remaining)")
     
     def _broadcast_message(self, message, sender=None):
         """Broadcast a message to all clients except sender"""
         # Encode message
         message_bytes = message.encode('utf-8')
-        packet = pack_message(CHAT, message_bytes)
+        if len(message_bytes) > MAX_MESSAGE_SIZE:
+            self._log(f"⚠️  Message too large to broadcast: {len(message_bytes)} bytes")
+            return
+        
+        # Header and payload go into the queues separately, so the payload is
+        # never copied into an intermediate packet
+        header = pack_header(CHAT, len(message_bytes))
+        
+        large = len(message_bytes) >= ZEROCOPY_THRESHOLD
+        size = len(header) + len(message_bytes)
+        overflowed = []
+        
+        # Queue for all clients; after_select() sends it
+        for client, info in self.clients.items():
+            if client is sender:
+                continue  # Don't echo back to sender
+            
+            # A client that stopped reading must not make the server hold every broadcast
+            if info['queued'] + size > CHAT_QUEUE_LIMIT:
+                overflowed.append(client)
+                continue
+            
+            info['queued'] += size
+            queue = info['queue']
+            self._queue_bytes(queue, header)
+            if large and info['zerocopy']:
+                queue.append(message_bytes)     # Sent in place, never modified
+            else:
+                self._queue_bytes(queue, message_bytes)
+            self._dirty.add(client)
+        
+        for client in overflowed:
+            address = self.clients[client]['addr']
+            self._log(f"✗ Dropping client {address[0]}:{address[1]}: "
+                      f"more than {CHAT_QUEUE_LIMIT} bytes of output queued")
+            self._close_client(client)
+    
+    def _queue_bytes(self, queue, data):
+        """Append data to the client's last coalescing segment"""
+        if queue and type(queue[-1]) is bytearray:
+            queue[-1] += data
+        else:
+            queue.append(bytearray(data))
+    
+    def _flush_client(self, client_socket):
+        """Send as much queued output as the socket takes"""
+        info = self.clients.get(client_socket)
+        if info is None:
+            return
+        
+        queue = info['queue']
+        
+        while queue:
+            segment = queue[0]
+            
+            try:
+                if type(segment) is bytearray:
+                    sent = client_socket.send(segment)
+                    info['queued'] -= sent
+                    del segment[:sent]
+                    if segment:
+                        break
+                else:
+                    if not self._send_zerocopy(client_socket, info, segment):
+                        break
+                    info['head_sent'] = 0
+            except BlockingIOError:
+                break
+            except OSError:
+                address = info['addr']
+                self._log(f"✗ Dropping client {address[0]}:{address[1]}: send failed")
+                self._close_client(client_socket)
+                return
+            
+            queue.popleft()
+        
+        # Only watch for writability while output is waiting
+        events = selectors.EVENT_READ
+        if queue:
+            events |= selectors.EVENT_WRITE
+        if self.selector.get_key(client_socket).events != events:
+            self.selector.modify(client_socket, events, data=self)
+    
+    def _send_zerocopy(self, client_socket, info, segment):
+        """Send the rest of a large payload; True once all of it is sent"""
+        offset = info['head_sent']
         
-        # Send to all clients
-        with self.clients_lock:
-            disconnected = []
+        if info['zerocopy']:
+            try:
+                sent = client_socket.send(memoryview(segment)[offset:], MSG_ZEROCOPY)
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                # Out of notification memory; send this client copies from now on
+                info['zerocopy'] = False
+                sent = client_socket.send(memoryview(segment)[offset:])
+            else:
+                # The kernel reads segment until it reports this send id done
+                info['zc_inflight'].append((info['zc_next'], segment))
+                info['zc_next'] += 1
+        else:
+            sent = client_socket.send(memoryview(segment)[offset:])
+        
+        info['queued'] -= sent
+        info['head_sent'] = offset + sent
+        return info['head_sent'] == len(segment)
+    
+    def _reap_zerocopy(self, client_socket, info):
+        """Release payloads the kernel has finished sending"""
+        inflight = info['zc_inflight']
+        
+        while True:
+            try:
+                _, ancdata, _, _ = client_socket.recvmsg(0, 256, socket.MSG_ERRQUEUE)
+            except OSError:
+                return  # Error queue drained
             
-            for client in self.clients:
-                if client == sender:
-                    continue  # Don't echo back to sender
+            for level, cmsg_type, data in ancdata:
+                if len(data) < _EXTENDED_ERR.size:
+                    continue
                 
-                try:
-                    client.sendall(packet)
-                except:
-                    disconnected.append(client)
-            
-            # Remove disconnected clients
-            for client in disconnected:
-                if client in self.clients:
-                    self.clients.remove(client)
+                ee_errno, origin, ee_type, code, pad, first, last = _EXTENDED_ERR.unpack_from(data)
+                if origin != SO_EE_ORIGIN_ZEROCOPY:
+                    continue
+                
+                # Sends first..last are complete
+                while inflight and inflight[0][0] <= last:
+                    inflight.popleft()
 
 
 def main():
@@ -6,6 +6,7 @@ Provides simple echo/receive servers for each protocol
 import socket
 import threading
 import argparse
+import multiprocessing
 import sys
 import os
 
@@ -15,21 +16,30 @@ sys.path.append(os.path.dirname(__file__))
 from shared.constants import (
     VIDEO_PORT, AUDIO_PORT, CHAT_PORT, 
     FILE_TRANSFER_PORT, SCREEN_SHARE_PORT,
-    BUFFER_SIZE, VIDEO_BUFFER_SIZE, AUDIO_BUFFER_SIZE
+    BUFFER_SIZE, VIDEO_BUFFER_SIZE, AUDIO_BUFFER_SIZE,
+    FILE_SOCKET_BUFFER_SIZE, UDP_RECV_BATCH
 )
+from shared.mmsg import DatagramReceiver, HAVE_RECVMMSG
+
+# One recv_into may drain this much of a file upload, so a transfer costs
+# a few hundred syscalls instead of one per 4 KB chunk
+FILE_RECV_SIZE = 1048576
 
 
 class DummyVideoServer:
     """Dummy UDP server for video testing"""
     
-    def __init__(self, port=VIDEO_PORT):
+    def __init__(self, port=VIDEO_PORT, reuse_port=False):
         self.port = port
+        self.reuse_port = reuse_port    # Share the port with other worker processes
         self.sock = None
         self.running = False
     
     def start(self):
         """Start dummy video server"""
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.reuse_port:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.sock.bind(('0.0.0.0', self.port))
         self.running = True
         
@@ -40,14 +50,22 @@ class DummyVideoServer:
         
         packet_count = 0
         
+        # Batch receives with recvmmsg where available
+        receiver = DatagramReceiver(UDP_RECV_BATCH, VIDEO_BUFFER_SIZE) if HAVE_RECVMMSG else None
+        
         try:
             while self.running:
-                data, addr = self.sock.recvfrom(VIDEO_BUFFER_SIZE)
-                packet_count += 1
+                if receiver:
+                    packets = receiver.recv(self.sock)
+                else:
+                    packets = (self.sock.recvfrom(VIDEO_BUFFER_SIZE),)
                 
-                if packet_count % 30 == 0:
-                    print(f"📦 Received {packet_count} packets from {addr[0]}:{addr[1]} | "
-                          f"Last size: {len(data)} bytes")
+                for data, addr in packets:
+                    packet_count += 1
+                    
+                    if packet_count % 30 == 0:
+                        print(f"📦 Received {packet_count} packets from {addr[0]}:{addr[1]} | "
+                              f"Last size: {len(data)} bytes")
         except KeyboardInterrupt:
             print("\n\n🛑 Stopping video server...")
         finally:
@@ -57,14 +75,17 @@ class DummyVideoServer:
 class DummyAudioServer:
     """Dummy UDP server for audio testing"""
     
-    def __init__(self, port=AUDIO_PORT):
+    def __init__(self, port=AUDIO_PORT, reuse_port=False):
         self.port = port
+        self.reuse_port = reuse_port    # Share the port with other worker processes
         self.sock = None
         self.running = False
     
     def start(self):
         """Start dummy audio server"""
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.reuse_port:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.sock.bind(('0.0.0.0', self.port))
         self.running = True
         
@@ -75,14 +96,22 @@ class DummyAudioServer:
         
         packet_count = 0
         
+        # Batch receives with recvmmsg where available
+        receiver = DatagramReceiver(UDP_RECV_BATCH, AUDIO_BUFFER_SIZE) if HAVE_RECVMMSG else None
+        
         try:
             while self.running:
-                data, addr = self.sock.recvfrom(AUDIO_BUFFER_SIZE)
-                packet_count += 1
+                if receiver:
+                    packets = receiver.recv(self.sock)
+                else:
+                    packets = (self.sock.recvfrom(AUDIO_BUFFER_SIZE),)
                 
-                if packet_count % 100 == 0:
-                    print(f"🔊 Received {packet_count} packets from {addr[0]}:{addr[1]} | "
-                          f"Last size: {len(data)} bytes")
+                for data, addr in packets:
+                    packet_count += 1
+                    
+                    if packet_count % 100 == 0:
+                        print(f"🔊 Received {packet_count} packets from {addr[0]}:{addr[1]} | "
+                              f"Last size: {len(data)} bytes")
         except KeyboardInterrupt:
             print("\n\n🛑 Stopping audio server...")
         finally:
@@ -101,6 +130,11 @@ class DummyFileServer:
         """Start dummy file server"""
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        
+        # Set before listen() so accepted sockets inherit the larger window
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, FILE_SOCKET_BUFFER_SIZE)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, FILE_SOCKET_BUFFER_SIZE)
+        
         self.sock.bind(('0.0.0.0', self.port))
         self.sock.listen(1)
         self.running = True
@@ -131,12 +165,15 @@ class DummyFileServer:
             total_received = 0
             packet_count = 0
             
+            # Data is not saved, so every chunk lands in the same buffer
+            buffer = memoryview(bytearray(FILE_RECV_SIZE))
+            
             while True:
-                data = client_sock.recv(BUFFER_SIZE)
-                if not data:
+                count = client_sock.recv_into(buffer)
+                if not count:
                     break
                 
-                total_received += len(data)
+                total_received += count
                 packet_count += 1
                 
                 if packet_count % 10 == 0:
@@ -195,6 +232,9 @@ class DummyScreenServer:
             frame_count = 0
             total_received = 0
             
+            # Frames are not displayed, so every chunk lands in the same buffer
+            buffer = memoryview(bytearray(BUFFER_SIZE))
+            
             while True:
                 # Receive frame size (4 bytes)
                 size_data = client_sock.recv(4)
@@ -207,10 +247,10 @@ class DummyScreenServer:
                 # Receive frame data
                 received = 0
                 while received < frame_size:
-                    chunk = client_sock.recv(min(frame_size - received, BUFFER_SIZE))
-                    if not chunk:
+                    count = client_sock.recv_into(buffer, min(frame_size - received, BUFFER_SIZE))
+                    if not count:
                         break
-                    received += len(chunk)
+                    received += count
                 
                 frame_count += 1
                 total_received += received
@@ -226,6 +266,36 @@ class DummyScreenServer:
             client_sock.close()
 
 
+def _run_udp_worker(server_class, port):
+    """Run one receiver process bound to a shared UDP port"""
+    try:
+        server_class(port, reuse_port=True).start()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_udp_workers(server_class, port, workers):
+    """Run several receiver processes on one UDP port
+    
+    With SO_REUSEPORT the kernel spreads incoming datagrams across the
+    sockets, so each process handles its own share on its own core.
+    """
+    processes = [
+        multiprocessing.Process(target=_run_udp_worker, args=(server_class, port), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("\n\n🛑 Stopping receiver workers...")
+        for process in processes:
+            process.terminate()
+
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description='Dummy Test Servers')
@@ -234,6 +304,8 @@ def main():
                        help='Server type to run')
     parser.add_argument('--port', type=int,
                        help='Port to listen on (default varies by mode)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Receiver processes sharing the port (video/audio only)')
     
     args = parser.parse_args()
     
@@ -250,6 +322,14 @@ def main():
         }
         port = ports[args.mode]
     
+    # Spread UDP receives across processes
+    if args.workers > 1 and args.mode in ('video', 'audio'):
+        if hasattr(socket, 'SO_REUSEPORT'):
+            server_class = DummyVideoServer if args.mode == 'video' else DummyAudioServer
+            run_udp_workers(server_class, port, args.workers)
+            return
+        print("⚠️  SO_REUSEPORT not supported here, running a single receiver")
+    
     # Start appropriate server
     if args.mode == 'video':
         server = DummyVideoServer(port)
@@ -3,7 +3,13 @@ Test script for video streaming functionality
 Demonstrates how to test video sender and receiver locally
 """
 
-print("""
+import sys
+import subprocess
+import time
+import os
+
+# Encoded once at import and written with a single call
+_BANNER = """
 ╔════════════════════════════════════════════════════════════════╗
 ║        LAN Collaboration App - Video Streaming Test           ║
 ╚════════════════════════════════════════════════════════════════╝
@@ -63,12 +69,12 @@ TROUBLESHOOTING:
    - Adjust VIDEO_QUALITY in shared/constants.py (0-100)
    - Change resolution in constants.py
 
-""")
 
-import sys
-import subprocess
-import time
-import os
+"""
+_BANNER_BYTES = _BANNER.encode('utf-8')
+
+sys.stdout.buffer.write(_BANNER_BYTES)
+sys.stdout.buffer.flush()
 
 def run_local_test():
     """Run both sender and receiver in separate processes"""
@@ -83,12 +89,16 @@ def run_local_test():
     print(f"\n📁 Project directory: {project_dir}")
     print(f"📄 Client script: {client_script}\n")
     
+    # The script path is absolute, so no cwd is needed. Without cwd and with
+    # close_fds=False, subprocess launches via posix_spawn (vfork) instead of
+    # fork+exec, which skips copying this process's page tables.
+    
     # Start receiver first
     print("🔵 Starting RECEIVER...")
     try:
         receiver_process = subprocess.Popen(
             [sys.executable, client_script, 'receive', '--port', '5001'],
-            cwd=project_dir
+            close_fds=False
         )
         print("✓ Receiver started (PID: {})".format(receiver_process.pid))
     except Exception as e:
@@ -103,7 +113,7 @@ def run_local_test():
     try:
         sender_process = subprocess.Popen(
             [sys.executable, client_script, 'send', '--ip', '127.0.0.1', '--port', '5001'],
-            cwd=project_dir
+            close_fds=False
         )
         print("✓ Sender started (PID: {})".format(sender_process.pid))
     except Exception as e: